@@ -6,9 +6,6 @@ Please see LICENSE.txt for full license.
 
 
 
-import numpy
-import yaml
-
 class Node(object):
     '''
     class containing all the functionality for the node of an acyclic directed graph    
@@ -19,13 +16,13 @@ class Node(object):
     def setnetwork(self,network):
         self.network = network
     def parents(self):
-        return self.network.itemparents(self.network.A,self)
+        return self.network.parents_item(self)
     def children(self):
-        return self.network.itemchildren(self.network.A,self)
+        return self.network.children_item(self)
     def allparents(self):
-        return self.network.itemparents(self.network.B,self)
+        return self.network.allparents_item(self)
     def allchildren(self):
-        return self.network.itemchildren(self.network.B,self)
+        return self.network.allchildren_item(self)
     def minmaxindex(self,sequence):
         return self.network.minmaxindex(self,sequence)
     def sortedallchildrensequence(self):
@@ -52,60 +49,59 @@ class Data(object):
         return self.name
 
 class AcyclicDirectedGraph(object):
-    '''Graph which holds the methods for an acyclic directed graph'''
+    '''Graph which holds the methods for an acyclic directed graph.
+    connections are stored as sets of direct parents and children per node.  
+    the topological order and the transitive parents and children of each node are computed on demand and cached until the graph changes.'''
     def __init__(self,nodes=None,connections=None):
         self.nodes = []
         self.connections = []
-        self.A = numpy.array([[]])
+        self.direct_parents = {}
+        self.direct_children = {}
+        self.clearcache()
         if nodes!=None:
             self.addnodes(nodes)
             if connections!=None:
                 self.addconnections(connections)
 
+    def clearcache(self):
+        '''forget the cached ordering and transitive relationships'''
+        self.cached_order = None
+        self.cached_position = None
+        self.cached_allparents = {}
+        self.cached_allchildren = {}
+
     def sequencevalid(self,sequence):
         '''checks whether the nodes of a given sequence are correctly ordered (below their children or above their parents)'''
-        allparents = self.allparents()
-        allchildren = self.allchildren()
+        positions = self.positions(sequence)
         for ii,node in enumerate(sequence):
-            above = set(sequence[:ii])
-            below = set(sequence[ii+1:])
-
-            children = set(allchildren[node])
-            parents = set(allparents[node])
-
-            if len(above.intersection(children))>0:
-                return False
-            if len(below.intersection(parents))>0:
-                return False
+            for parent in self.allparents_set(node):
+                if positions.get(parent,-1)>ii:
+                    return False
         return True
 
     def subsequencecomplete(self,sequence):
         '''checks whether a given sequence's nodes have all their parents in the subsequence as well'''
-        allparents = self.allparents()
-        allchildren = self.allchildren()
+        positions = self.positions(sequence)
         for ii,node in enumerate(sequence):
-            above = set(sequence[:ii])
-            below = set(sequence[ii+1:])
-
-            children = set(allchildren[node])
-            parents = set(allparents[node])
-            pass
-
-            if len(parents.difference(above))>0:
-                return False
-            if len(above.intersection(children))>0:
-                return False
-            if len(below.intersection(parents))>0:
-                return False
+            for parent in self.allparents_set(node):
+                if positions.get(parent,ii)>=ii:
+                    return False
         return True
 
+    @staticmethod
+    def positions(sequence):
+        '''return the first position of each item in a sequence'''
+        positions = {}
+        for ii,item in enumerate(sequence):
+            if not item in positions:
+                positions[item] = ii
+        return positions
+
     def minmaxindex(self,node,sequence):
         '''returns the minimum and maximum position in a sequence any given node can reside in to keep a sequence correctly ordered'''
-        allparents = self.allparents()
-        allchildren = self.allchildren()
-        
-        parentindeces = [sequence.index(parent) for parent in allparents[node] if parent in sequence]
-        childindeces = [sequence.index(child) for child in allchildren[node] if child in sequence]
+        positions = self.positions(sequence)
+        parentindeces = [positions[parent] for parent in self.allparents_set(node) if parent in positions]
+        childindeces = [positions[child] for child in self.allchildren_set(node) if child in positions]
 
         i_max = 0
         i_min = len(sequence)-1
@@ -117,188 +113,156 @@ class AcyclicDirectedGraph(object):
                 
     def addnode(self,node):
         '''add a node to the network'''
-        if isinstance(node,Node):
-            node.setnetwork(self)
-        n=node
-        self.nodes.append(n)
-        self.cleannodes()
-        
-        self.buildAB()
+        self.addnodes([node])
         
     def cleannodes(self):
-        '''remove duplicate nodes and rebuild internal connection matrix'''
-#        self.nodes = sorted(list(set(self.nodes)))
-        self.nodes = list(set(self.nodes))
-        self.buildAB()
+        '''remove duplicate nodes, keeping the first occurrence of each'''
+        self.nodes = list(self.positions(self.nodes).keys())
         
     def cleanconnections(self):
-        '''remove duplicate connections and rebuild internal connection matrix'''
-        self.connections = list(set(self.connections))
-        self.buildAB()
+        '''remove duplicate connections, keeping the first occurrence of each'''
+        self.connections = list(self.positions(self.connections).keys())
 
     def addnodes(self,nodes):
         '''add a list of nodes to the network'''
         for node in nodes:
             if isinstance(node,Node):
                 node.setnetwork(self)
-        self.nodes.extend(nodes)
-        self.cleannodes()
+            if not node in self.direct_parents:
+                self.nodes.append(node)
+                self.direct_parents[node] = set()
+                self.direct_children[node] = set()
+        self.clearcache()
 
     def addconnection(self,parent,child):
-        '''add a connection to the network and recalculate internal stuff'''
-        self.addsingleconnection(parent,child)
-        self.cleanconnections()
+        '''add a connection to the network'''
+        self.addconnections([(parent,child)])
 
     def addsingleconnection(self,parent,child):
-        '''just add the connection to the network, don't recalculate anything'''
-        if parent in self.nodes and child in self.nodes:
-            if parent in self.allchildren_item(child):
-                raise(Exception('the parent is a child'))
-            else:
+        '''just add the connection to the network, without checking that the graph is still acyclic'''
+        if parent in self.direct_parents and child in self.direct_parents:
+            if not parent in self.direct_parents[child]:
+                self.direct_parents[child].add(parent)
+                self.direct_children[parent].add(child)
                 self.connections.append((parent,child))
+                self.clearcache()
+                return True
+        return False
         
     def addconnections(self,connections):
-        '''add a list of connections to the network and recalculate internal stuff'''
-        for parent,child in connections:
-            self.addsingleconnection(parent,child)
-        self.cleanconnections()
+        '''add a list of connections to the network.  if this would create a cycle, no connections are added'''
+        added = [(parent,child) for parent,child in connections if self.addsingleconnection(parent,child)]
+        if added:
+            try:
+                self.order()
+            except ValueError:
+                for parent,child in added:
+                    self.direct_parents[child].remove(parent)
+                    self.direct_children[parent].remove(child)
+                    self.connections.remove((parent,child))
+                self.clearcache()
+                raise(Exception('the parent is a child'))
 
-    def buildAB(self):
-        '''build internal representation of directed connections'''
-        A,self.forwardindex,self.reverseindex = self.findA(self.nodes,self.connections)
-        self.A = A
-        self.B = self.findB(A)
+    def order(self):
+        '''return all nodes in a topological order, breaking ties by the order the nodes were added'''
+        if self.cached_order == None:
+            import heapq
+            index = dict([(node,ii) for ii,node in enumerate(self.nodes)])
+            remaining = dict([(node,len(parents)) for node,parents in self.direct_parents.items()])
+            heap = [index[node] for node,count in remaining.items() if count==0]
+            heapq.heapify(heap)
+            order = []
+            while heap:
+                node = self.nodes[heapq.heappop(heap)]
+                order.append(node)
+                for child in self.direct_children[node]:
+                    remaining[child]-=1
+                    if remaining[child]==0:
+                        heapq.heappush(heap,index[child])
+            if len(order)<len(self.nodes):
+                raise(ValueError('graph contains a cycle'))
+            self.cached_order = order
+            self.cached_position = dict([(node,ii) for ii,node in enumerate(order)])
+        return self.cached_order
 
-    @staticmethod
-    def findA(nodes,connections):
-        '''return a single-step connection matrix'''        
-        m  = len(nodes)
-        A = numpy.zeros((m,m),dtype = bool)
-        
-        forwardindex = dict([(node,ii) for ii,node in enumerate(nodes)])
-        reverseindex = dict([(ii,node) for ii,node in enumerate(nodes)])
-        
-        for connection in connections:
-            A[forwardindex[connection[0]],forwardindex[connection[1]]] = 1
-            
-        return A, forwardindex, reverseindex
-        
-    @staticmethod    
-    def findB(A):
-        '''find all connections between nodes...brute force method.'''
-        B = A.copy()
-        lastB = numpy.zeros(A.shape)
-        while not (B == lastB).all():
-            lastB = B
-            B = B.dot(A)+B
-        return lastB
+    def ordered(self,nodes):
+        '''return a collection of nodes as a list in topological order'''
+        self.order()
+        return sorted(nodes,key = self.cached_position.__getitem__)
+
+    def reach(self,node,adjacency,cache):
+        '''return the set of nodes reachable from node through adjacency, memoized in cache'''
+        try:
+            return cache[node]
+        except KeyError:
+            pass
+        found = set()
+        stack = list(adjacency[node])
+        while stack:
+            item = stack.pop()
+            if not item in found:
+                found.add(item)
+                try:
+                    found.update(cache[item])
+                except KeyError:
+                    stack.extend(adjacency[item])
+        cache[node] = found
+        return found
+
+    def allparents_set(self,child):
+        return self.reach(child,self.direct_parents,self.cached_allparents)
+    def allchildren_set(self,child):
+        return self.reach(child,self.direct_children,self.cached_allchildren)
 
     def parents(self):
         '''return the direct parents of nodes'''
-        parents = {}
-        for child in self.nodes:
-            parents[child] = self.itemparents(self.A,child)
-        return parents
+        return dict([(child,self.parents_item(child)) for child in self.nodes])
     def children(self):
         '''return the direct children of nodes'''
-        parents = {}
-        for child in self.nodes:
-            parents[child] = self.itemchildren(self.A,child)
-        return parents
+        return dict([(child,self.children_item(child)) for child in self.nodes])
     def allparents(self):
         '''return all parents of nodes'''
-        parents = {}
-        for child in self.nodes:
-            parents[child] = self.itemparents(self.B,child)
-        return parents
+        return dict([(child,self.allparents_item(child)) for child in self.nodes])
     def allchildren(self):
         '''return all children of nodes'''
-        parents = {}
-        for child in self.nodes:
-            parents[child] = self.itemchildren(self.B,child)
-        return parents
+        return dict([(child,self.allchildren_item(child)) for child in self.nodes])
 
     def parents_item(self,child):
         '''return the direct parents of nodes'''
-        return self.itemparents(self.A,child)
+        return self.ordered(self.direct_parents[child])
     def children_item(self,child):
         '''return the direct children of nodes'''
-        return self.itemchildren(self.A,child)
+        return self.ordered(self.direct_children[child])
     def allparents_item(self,child):
         '''return all parents of nodes'''
-        return self.itemparents(self.B,child)
+        return self.ordered(self.allparents_set(child))
     def allchildren_item(self,child):
         '''return all children of nodes'''
-        return self.itemchildren(self.B,child)
-        
-    def itemparents(self,C,child):
-        '''return the parents of a particular node.  The input connection matrix C determines what type of relationship'''
-#        array = numpy.array(C)
-        ii = self.forwardindex[child]
-        itemparents = C[:,ii].nonzero()[0].tolist()            
-        itemparents = [self.reverseindex[item] for item in itemparents ]
-        return itemparents
-        
-    def itemchildren(self,C,child):
-        '''return the children of a particular node.  The input connection matrix C determines what type of relationship'''
-#        array = numpy.array(C)
-        ii = self.forwardindex[child]
-        itemparents = C[ii,:].nonzero()[0].tolist()            
-        itemparents = [self.reverseindex[item] for item in itemparents ]
-        return itemparents
+        return self.ordered(self.allchildren_set(child))
             
     def fixsequence(self,sequence):
         '''given an input sequence, return a correctly-ordered sequence which contains all necessary parents.'''
-        extendedlist = self.buildfullsequence(sequence)
-        reverseindex = dict([(ii,item) for ii,item in enumerate(extendedlist)])
-        
-        subA,subB = self.generatesubmatrices(extendedlist)
-
-        currentindeces = []
-        for ii,item in enumerate(extendedlist):
-            temp = subB.copy()
-            temp[:,currentindeces]=1
-            temp[currentindeces,:]=1
-            nextrows = sum(temp,0)==len(currentindeces)
-            nextrows = nextrows.nonzero()[0].tolist()
-            currentindeces.extend(nextrows)
-            if len(currentindeces)>=len(extendedlist):
-                break
-        sequence  = [reverseindex[item] for item in currentindeces]
-
-        if len(set(extendedlist) - set(sequence))>0:
-            raise(Exception('Invalid Sequence'))
-
-        return sequence
+        return self.ordered(self.buildfullsequence(sequence))
         
     def buildfullsequence(self,sequence):
         '''for a given sequence, return a sequence which contains all necessary parent nodes'''
-        extendedlist = []
-        [extendedlist.extend(self.itemparents(self.B,item)) for item in sequence]
-        extendedlist = (list(set(extendedlist+sequence)))
-        return extendedlist
-
-    def generatesubmatrices(self,sequence):
-        '''return connection submatrices consisting just of nodes and connections in the given sequence.'''
-        iis = [self.forwardindex[item] for item in sequence]
-        subA = self.A[iis,:][:,iis]
-        subB = self.B[iis,:][:,iis]
-        return subA,subB        
+        extendedlist = set(sequence)
+        for item in sequence:
+            extendedlist.update(self.allparents_set(item))
+        return list(extendedlist)
 
     def sortedallchildrensequence(self,node):
-        '''return a correctly ordered sequence of a node and all its children'''
-        newsequence = self.fixsequence([node]+self.itemchildren(self.B,node))
+        '''return a correctly ordered sequence of a node and all its children, along with any other parents of those children which come after the node'''
+        newsequence = self.fixsequence([node]+self.allchildren_item(node))
         ii = newsequence.index(node)
-        return newsequence[ii:]    
+        return newsequence[ii:]
 
     def sortedallchildrenofnodes(self,nodes):
-        '''return a correctly ordered sequence of nodes and all their children'''
-
-        allchildren = [child for node in nodes for child in self.itemchildren(self.B,node)]
-        newsequence = self.fixsequence(nodes+allchildren)
-        iis = [newsequence.index(node)for node in nodes]
-        ii = min(iis)
-        return newsequence[ii:]    
+        '''return a correctly ordered sequence of nodes and all their children, along with any other parents of those children which come after the first node'''
+        allchildren = [child for node in nodes for child in self.allchildren_item(node)]
+        newsequence = self.fixsequence(list(nodes)+allchildren)
+        ii = min([newsequence.index(node) for node in nodes])
+        return newsequence[ii:]
 
 if __name__=='__main__':
-    pass
\ No newline at end of file
+    pass
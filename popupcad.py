@@ -9,6 +9,9 @@ import sys
 import popupcad
 
 if __name__ == "__main__":
+    if len(sys.argv)>1 and sys.argv[1]=='batch':
+        import popupcad.batch
+        sys.exit(popupcad.batch.main(sys.argv[2:])>0)
     program = popupcad.filetypes.program.Program(*sys.argv)
     sys.exit(program.app.exec_())
     
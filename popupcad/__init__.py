@@ -62,6 +62,12 @@ popupcad_home_path = os.path.normpath(os.path.join(user_home_dir,popupcad_dirnam
 backup_timeout = 1000*60*5
 backup_limit = 10
 
+default_output_cache_size = 500
+default_buffer_memo_size = 64
+default_constraint_cache_size = 32
+default_constraint_backend = 'sympy'
+default_constraint_sparse_threshold = 200
+
 designdir = os.path.normpath(os.path.join(popupcad_home_path ,'designs'))
 importdir = os.path.normpath(os.path.join(popupcad_home_path ,'import'))
 exportdir = os.path.normpath(os.path.join(popupcad_home_path ,'export'))
@@ -69,6 +75,7 @@ scriptdir = os.path.normpath(os.path.join(popupcad_home_path ,'scripts'))
 sketchdir = os.path.normpath(os.path.join(popupcad_home_path ,'sketches'))
 shapedir = os.path.normpath(os.path.join(popupcad_home_path ,'shapes'))
 backupdir = os.path.normpath(os.path.join(popupcad_home_path ,'backup'))
+cachedir = os.path.normpath(os.path.join(popupcad_home_path ,'cache'))
 
 settings_filename = os.path.normpath(os.path.join(popupcad_home_path ,'settings.popupcad'))
 
@@ -78,7 +85,7 @@ lastsketchdir = sketchdir
 lastimportdir = importdir
 lastshapedir = shapedir
 
-subdirectories = [popupcad_home_path,designdir,importdir,exportdir,scriptdir,sketchdir,shapedir,backupdir]
+subdirectories = [popupcad_home_path,designdir,importdir,exportdir,scriptdir,sketchdir,shapedir,backupdir,cachedir]
 for path in subdirectories:
     if not os.path.isdir(path):
         os.mkdir(path)
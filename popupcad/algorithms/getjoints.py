@@ -12,18 +12,17 @@ import math
 
 roundvalue = 3
 tolerance = 10**(-roundvalue)
-def getjoints(geoms):
-    from popupcad.geometry.vertex import ShapeVertex
-    from popupcad.filetypes.genericshapes import GenericLine
-    
+def lines_from_geoms(geoms):
     lines = []
-    
     for geom in geoms:
         p = geom.exteriorpoints()
         lines.extend(zip(p,p[1:]+p[:1]))
         for interior in geom.interiorpoints():
             lines.extend(zip(interior,interior[1:]+interior[:1]))
-    
+    return lines
+
+def colinear_groups(lines):
+    '''group lines lying on the same infinite line, keyed by their rounded distances from five nearby points'''
     l3 = popupcad.algorithms.points.distance_of_lines(lines,[0,0])
     l4 = popupcad.algorithms.points.distance_of_lines(lines,[10*tolerance,0])
     l5 = popupcad.algorithms.points.distance_of_lines(lines,[10*tolerance,10*tolerance])
@@ -32,30 +31,62 @@ def getjoints(geoms):
     m=numpy.c_[l3,l4,l5,l6,l7]
     m = m.round(roundvalue)
     m2 = [tuple(items) for items in m.tolist()]
+#    groups are returned in the order of the set of keys, as they always have been
     m3 = list(set(m2))
-#    jj = numpy.searchsorted(m3,m2)   
-    index_to_unique = [m3.index(item) for item in m2]
+    index_of_unique = dict([(item,ii) for ii,item in enumerate(m3)])
     indeces_to_orig = [[] for item in m3]
-    [indeces_to_orig[item].append(ii) for ii,item in enumerate(index_to_unique)]
+    for ii,item in enumerate(m2):
+        indeces_to_orig[index_of_unique[item]].append(ii)
+    return indeces_to_orig
+
+def order_along_line(vertices,segment_seed,tolerance):
+    '''order vertices along the line of segment_seed by their projections onto it.
+    if any vertex is off the line or nearly coincides with another, fall back to points.order_vertices, which decides point by point'''
+    seed = list(segment_seed)
+    unique = [vertex for vertex in set(vertices) if not vertex in seed]
+    if not unique:
+        return seed
+    a,b = numpy.array(seed,dtype = float)
+    direction = b-a
+    length = direction.dot(direction)**.5
+    if length<tolerance:
+        return popupcad.algorithms.points.order_vertices(vertices,segment_seed,tolerance = tolerance)
+    relative = numpy.array(unique,dtype = float)-a
+    offsets = (direction[0]*relative[:,1]-direction[1]*relative[:,0])/length
+    projections = numpy.r_[0,length,relative.dot(direction)/length]
+    order = numpy.argsort(projections,kind = 'mergesort')
+    gaps = numpy.diff(projections[order])
+    if (abs(offsets)>tolerance*1e-3).any() or (gaps<tolerance).any():
+        return popupcad.algorithms.points.order_vertices(vertices,segment_seed,tolerance = tolerance)
+    candidates = seed+unique
+    return [candidates[ii] for ii in order]
+
+def shared_segments(geoms):
+    '''return the pieces of edges which are shared by more than one line of the given shapes, as pairs of points'''
+    lines = lines_from_geoms(geoms)
+    if not lines:
+        return []
+    lines_array = numpy.array(lines,dtype = float)
 
     newsegments = []
-    for segments in indeces_to_orig:
+    for segments in colinear_groups(lines):
         if len(segments)>1:
             a = [lines[ii] for ii in segments]
             vertices = []
             [vertices.extend(item) for item in a[1:]]
-            ordered_vertices = popupcad.algorithms.points.order_vertices(vertices,a[0],tolerance = tolerance)
+            ordered_vertices = order_along_line(vertices,a[0],tolerance = tolerance)
             segs = list(zip(ordered_vertices[:-1],ordered_vertices[1:]))
             midpoints = popupcad.algorithms.points.segment_midpoints(segs)
-            count = [0 for item in midpoints]
-            for ii in segments:
-                for jj,point in enumerate(midpoints):
-                    if popupcad.algorithms.points.point_within_line(point,lines[ii],tolerance = tolerance):
-                        count[jj]+=1
+            within = popupcad.algorithms.points.points_within_lines(midpoints,lines_array[segments],tolerance = tolerance)
+            count = within.sum(1)
             newsegments.extend([seg for count_ii,seg in zip(count,segs) if count_ii>1])
-#            newsegments.extend(segs)
+    return newsegments
 
+def getjoints(geoms):
+    from popupcad.geometry.vertex import ShapeVertex
+    from popupcad.filetypes.genericshapes import GenericLine
+    
+    newsegments = shared_segments(geoms)
     newsegments2 = [GenericLine([ShapeVertex(position=v1),ShapeVertex(position=v2)],[]) for v1,v2 in newsegments]
     outputsegments = [segment.outputinteractive() for segment in newsegments2 if len(segment.get_exterior())==2]
     return outputsegments
-        
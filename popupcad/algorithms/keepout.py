@@ -5,27 +5,79 @@ Email: danaukes<at>seas.harvard.edu.
 Please see LICENSE.txt for full license.
 """
 from popupcad.filetypes.layer import Layer
-from popupcad.filetypes.laminate import Laminate
+from popupcad.filetypes.laminate import Laminate,map_layers,layer_binaryoperation
 
+class KeepoutUnions(object):
+    '''the cumulative unions of a laminate's layers, from which every keepout is derived.
+    prefix[ii] is the union of layers 0 through ii, suffix[ii] the union of layers ii through the last'''
+    def __init__(self,laminate):
+        self.layerdef = laminate.layerdef
+        layers = [laminate.layer_sequence[layer] for layer in self.layerdef.layers]
+        self.state = laminate.layer_state()
+
+        self.prefix = []
+        l = Layer([])
+        for layer in layers:
+            l = l.union(layer)
+            self.prefix.append(l)
+
+        self.suffix = []
+        l = Layer([])
+        for layer in layers[::-1]:
+            l = l.union(layer)
+            self.suffix.insert(0,l)
+
+    def is_current(self,laminate):
+        '''check that the laminate still holds the same layers and geometry the unions were built from'''
+        return laminate.layerdef is self.layerdef and laminate.has_layer_state(self.state)
+
+    def total(self):
+        try:
+            return self.prefix[-1]
+        except IndexError:
+            return Layer([])
+
+    def laminate(self,layers):
+#        the cached layer objects are placed directly in every laminate returned, and in several layers of it at once.
+#        this relies on laminates never modifying a layer object in place, see Laminate.insertlayergeoms
+        lsout = Laminate(self.layerdef)
+        for layer,layerobject in zip(self.layerdef.layers,layers):
+            lsout.replacelayer(layer,layerobject)
+        return lsout
+
+    def laser(self):
+        return self.laminate([self.total()]*len(self.layerdef.layers))
+
+    def mill(self):
+        return self.laminate(self.suffix)
+
+    def millflip(self):
+        try:
+            return self.laminate(self._millflip)
+        except AttributeError:
+            n = len(self.layerdef.layers)
+            self._millflip = map_layers(layer_binaryoperation,self.prefix,self.suffix,['intersection']*n)
+            return self.laminate(self._millflip)
+
+def keepout_unions(laminate):
+    '''return the cumulative unions of a laminate, computed once and kept with the laminate until its layers change'''
+    try:
+        unions = laminate._keepout_unions
+        if unions.is_current(laminate):
+            return unions
+    except AttributeError:
+        pass
+    laminate._keepout_unions = KeepoutUnions(laminate)
+    return laminate._keepout_unions
 
 def laserkeepout(laminatein):
     '''calculate the keepout for an input laminate assuming laser cutting'''
-    layers = laminatein.layerdef.layers
-    laminateout = laminatein.unarylayeroperation('union',layers,layers)
-    return laminateout
+    return keepout_unions(laminatein).laser()
 
 def millkeepout(laminatein):
     '''calculate the keepout for an input laminate assuming milling'''
-    l = Layer([])
-    laminateout = Laminate(laminatein.layerdef)
-    for ii,geoms in enumerate(laminatein[::-1]):
-        l = l.union(geoms)
-        laminateout[-1-ii] =l
-    return laminateout
+    return keepout_unions(laminatein).mill()
 
 def millflipkeepout(laminatein):
     '''calculate the keepout for an input laminate assuming milling & part flipping'''
-    l1 = millkeepout(laminatein)
-    l2 = millkeepout(laminatein.flip()).flip()
-    lout = l1.intersection(l2)
-    return lout
\ No newline at end of file
+    return keepout_unions(laminatein).millflip()
@@ -5,12 +5,46 @@ Email: danaukes<at>seas.harvard.edu.
 Please see LICENSE.txt for full license.
 """
 
+def cleanup3_geometry(geom,value,resolution):
+    '''the sequence of Cleanup3, applied to one layer's merged geometry'''
+    g2 = geom.buffer(-value,resolution = resolution)
+    g3 = g2.buffer(2*value,resolution = resolution)
+    g4 = geom.intersection(g3)
+
+    g5 = geom.buffer(value*10,resolution = resolution)
+    g6 = g5.difference(geom)
+    g7 = g6.buffer(-value,resolution = resolution)
+    g8 = g7.buffer(2*value,resolution = resolution)
+    g9 = g6.intersection(g8)
+    g9_1 = g5.difference(g9)
+    g10 = g4.symmetric_difference(g9_1)
+    g11 = geom.symmetric_difference(g10)
+    return g11
+
+def map_merged(ls1,function,*args):
+    '''apply function(merged geometry,*args) to every layer of a laminate, in parallel if enabled.
+    each step of a layer-wise sequence works on the previous step's GEOS result, exactly as chained laminate operations do,
+    but without building a Laminate and re-wrapping the geometry at every step'''
+    from popupcad.filetypes.laminate import Laminate,map_layers
+    from popupcad.filetypes.layer import Layer
+    layers = ls1.layerdef.layers
+    geoms = [ls1.layer_sequence[layer].merged() for layer in layers]
+    results = map_layers(function,geoms,*[[arg]*len(layers) for arg in args])
+    lsout = Laminate(ls1.layerdef)
+    for layer,result in zip(layers,results):
+        lsout.replacelayer(layer,Layer.from_geos(result))
+    return lsout
+
 def cleanup(ls1,value,resolution):
+    '''chained through Laminate.buffer, so that each step is remembered by the buffer memo of a regeneration in progress'''
     closing = ls1.buffer(-value,resolution = resolution)
     opening = closing.buffer(2*value,resolution = resolution)
     closing2 = opening.buffer(-value,resolution = resolution)
     return closing2
 
+def cleanup3(ls1,value,resolution):
+    return map_merged(ls1,cleanup3_geometry,value,resolution)
+
 def simplify(ls1,value):
     closing = ls1.simplify(value)
     return closing
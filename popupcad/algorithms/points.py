@@ -107,6 +107,70 @@ def inner_segment(line1,line2,tolerance):
 
     return points
         
+def as_points(points):
+    '''return a sequence of points as an N*2 float array'''
+    return numpy.array(points,dtype = float).reshape((-1,2))
+
+def as_lines(lines):
+    '''return a sequence of two-point lines as an M*2*2 float array'''
+    return numpy.array(lines,dtype = float).reshape((-1,2,2))
+
+def point_distances(points1,points2):
+    '''the N*M matrix of distances between N points and M points'''
+    points1 = as_points(points1)
+    points2 = as_points(points2)
+    v = points2[None,:,:]-points1[:,None,:]
+    return (v*v).sum(-1)**.5
+
+def points_thesame(points1,points2,tolerance):
+    '''twopointsthesame for every combination of N points and M points, as an N*M boolean array'''
+    return point_distances(points1,points2)<tolerance
+
+def pairs_thesame(points1,points2,tolerance):
+    '''twopointsthesame for each pair of corresponding points in two N*2 arrays, as an N boolean array'''
+    v = as_points(points2)-as_points(points1)
+    return (v*v).sum(-1)**.5<tolerance
+
+def points_in_points(points1,points2,tolerance):
+    '''pointinpoints for each of N points against the same M points, as an N boolean array'''
+    return points_thesame(points1,points2,tolerance).any(1)
+
+def points_on_lines(points,lines,tolerance):
+    '''point_on_line for every combination of N points and M lines, as an N*M boolean array'''
+    points = as_points(points)
+    lines = as_lines(lines)
+    p1 = lines[:,0,:]
+    v = lines[:,1,:] - p1
+    lv = (v*v).sum(-1)
+    v2 = points[:,None,:] - p1[None,:,:]
+    lv2 = (v2*v2).sum(-1)
+    vpoint = (v[None,:,:]*v2).sum(-1)**2 - lv[None,:]*lv2
+    vpoint = abs(vpoint)**(.5)
+    return abs(vpoint)<abs(tolerance)
+
+def points_within_lines(points,lines,tolerance):
+    '''point_within_line for every combination of N points and M lines, as an N*M boolean array'''
+    points = as_points(points)
+    lines = as_lines(lines)
+    p1 = lines[:,0,:]
+    v = lines[:,1,:] - p1
+    v2 = points[:,None,:] - p1[None,:,:]
+    lv = (v*v).sum(-1)**.5
+    lv2 = (v2*v2).sum(-1)**.5
+    v_dot_v2 = (v[None,:,:]*v2).sum(-1)
+    same_orientation = v_dot_v2>0
+    within = lv2<lv[None,:]
+    same_direction = abs(abs(v_dot_v2)-(lv[None,:]*lv2))<tolerance
+    return same_direction & same_orientation & within
+
+def shared_edges(lines1,lines2,tolerance):
+    '''shared_edge for every combination of N lines and M lines, as an N*M boolean array'''
+    lines2 = as_lines(lines2)
+    colinear = points_on_lines(lines2[:,0,:],lines1,tolerance) & points_on_lines(lines2[:,1,:],lines1,tolerance)
+    a = points_within_lines(lines2[:,0,:],lines1,tolerance)
+    b = points_within_lines(lines2[:,1,:],lines1,tolerance)
+    return (colinear & (a | b)).T
+
 def calctransformfrom2lines(pointset1,pointset2,scale_x = None,scale_y = None):
     import math
     pointset1 = numpy.array(pointset1)
@@ -178,37 +242,28 @@ def jointholes(sketch_result,layerdef):
         if not not value:
             allgeoms = value
             hingelayer = key
-    allpoints = []
-    for geom in allgeoms:
-        allpoints.extend(geom.exteriorpoints())
-    allpoints.sort()
-    commonpoints = []
-    
-    for ii,point1 in enumerate(allpoints[1:-1]):
-        point0 = allpoints[ii]
-        point2 = allpoints[ii+2]
-        a = popupcad.algorithms.points.twopointsthesame(point1,point2,1e-5)
-        b = popupcad.algorithms.points.twopointsthesame(point0,point1,1e-5)
-        if ii==0:
-            if b:
-                commonpoints.append(point1)
-            elif a:
-                commonpoints.append(point1)
-        else:
-            if (a and (not b)):
-                commonpoints.append(point1)
+    exteriors = [geom.exteriorpoints() for geom in allgeoms]
+    allpoints = [point for exterior in exteriors for point in exterior]
+    owners = [(gg,kk) for gg,exterior in enumerate(exteriors) for kk in range(len(exterior))]
+
+#    points closer than the tolerance are clustered with one query, and each cluster of two or more is a hinge endpoint
+    from scipy.spatial import cKDTree
+    from popupcad.geometry.spatialindex import DisjointSets
+    tree = cKDTree(as_points(allpoints))
+    clusters = DisjointSets(range(len(allpoints)))
+    for ii,jj in tree.query_pairs(1e-5):
+        clusters.join(ii,jj)
+    commonpoints = [min([allpoints[ii] for ii in group]) for group in clusters.groups(range(len(allpoints))) if len(group)>1]
+    commonpoints.sort()
 
     shapelys = []
     for point in commonpoints:
         lineset = {}
-        for item in allgeoms:
-            points = numpy.array(item.exteriorpoints())
-            points -= point
-            l = (points[:,0]**2+points[:,1]**2)**.5
-            test = l<1e-5
-            if True in test:
-                ii = 1-test.nonzero()[0][0]
-                lineset[item] = math.atan2(points[ii,1],points[ii,0])
+        for ii in sorted(tree.query_ball_point(point,1e-5)):
+            gg,kk = owners[ii]
+            if not allgeoms[gg] in lineset:
+                other = numpy.array(exteriors[gg][1-kk])-point
+                lineset[allgeoms[gg]] = math.atan2(other[1],other[0])
         q_s = sorted(lineset.items(),key = operator.itemgetter(1))
         gaps = [item1[1]-item0[1] for item0,item1 in zip(q_s[:-1],q_s[1:])] + [2*math.pi+q_s[0][1]-q_s[-1][1]]
         min_gap = min(gaps)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+
+Regenerate designs and export their outputs without starting the editor.
+usage: python popupcad.py batch [options] design.cad [design2.cad ...]
+"""
+import os
+import sys
+import time
+import argparse
+import popupcad
+
+export_formats = ['svg','laminate']
+
+def peak_memory():
+    '''return the peak resident memory of this process in MB, or None where it cannot be measured'''
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform=='darwin':
+        peak/=1024.
+    return peak/1024.
+
+def find_outputs(design,selections):
+    '''return (operation,output index) pairs matching selections of the form "name" or "name:index".
+    with no selections, the first output of the last operation is used, as in the editor'''
+    if not selections:
+        return [(design.operations[-1],0)]
+    found = []
+    for selection in selections:
+        name,separator,index = selection.rpartition(':')
+        if not separator or not index.isdigit():
+            name,index = selection,'0'
+        matches = [op for op in design.operations if str(op)==name]
+        if not matches:
+            raise(Exception('no operation named '+name))
+        found.extend([(op,int(index)) for op in matches])
+    return found
+
+def svg_path(geom):
+    '''return svg path data for a shapely polygon or linestring, with y pointing up'''
+    try:
+        rings = [geom.exterior]+list(geom.interiors)
+        close = ' Z'
+    except AttributeError:
+        rings = [geom]
+        close = ''
+    paths = []
+    for ring in rings:
+        points = ['{0:f},{1:f}'.format(x,-y) for x,y in list(ring.coords)]
+        if points:
+            paths.append('M '+' L '.join(points)+close)
+    return ' '.join(paths)
+
+def export_svg(geoms,filename):
+    '''write a layer's shapely geometry to an svg file in mm'''
+    scaling = popupcad.internal_argument_scaling
+    paths = [svg_path(geom) for geom in geoms if geom.geom_type in ('Polygon','LineString')]
+    bounds = [geom.bounds for geom in geoms if not geom.is_empty]
+    if bounds:
+        xmin = min([item[0] for item in bounds])
+        ymin = min([item[1] for item in bounds])
+        xmax = max([item[2] for item in bounds])
+        ymax = max([item[3] for item in bounds])
+    else:
+        xmin,ymin,xmax,ymax = 0.,0.,0.,0.
+    width = xmax-xmin
+    height = ymax-ymin
+    with open(filename,'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" width="{0:f}mm" height="{1:f}mm" viewBox="{2:f} {3:f} {4:f} {5:f}">\n'.format(width/scaling,height/scaling,xmin,-ymax,width,height))
+        for path in paths:
+            f.write('<path d="{0}" fill="none" stroke="black" stroke-width="{1:f}" fill-rule="evenodd"/>\n'.format(path,.1*scaling))
+        f.write('</svg>\n')
+
+def export_output(design,operation,output_index,exportformat,exportdir):
+    '''export one operation output, returning the list of files written'''
+    output = operation.output[output_index]
+    basename = design.get_basename()+'_'+str(operation)
+    if output_index>0:
+        basename+='_{0:d}'.format(output_index)
+    filenames = []
+    if exportformat=='svg':
+        for layernum,layer in enumerate(design.return_layer_definition().layers):
+            filename = os.path.normpath(os.path.join(exportdir,basename+'_layer{0:02d}.svg'.format(layernum+1)))
+            export_svg(output.csg.layer_sequence[layer].geoms,filename)
+            filenames.append(filename)
+    elif exportformat=='laminate':
+        filename = os.path.normpath(os.path.join(exportdir,basename+'.laminate'))
+        output.csg.to_generic_laminate().save_yaml(filename)
+        filenames.append(filename)
+    else:
+        raise(Exception('unknown export format: '+exportformat))
+    return filenames
+
+def process_file(filename,selections = None,exportformats = None,exportdir = None,use_cache = True,profile = False):
+    '''load, regenerate and export a single design, returning a dictionary of results'''
+    from popupcad.filetypes.design import Design
+    popupcad.settings.output_cache_enabled = use_cache
+    result = {'filename':filename,'error':None,'exported':[]}
+    try:
+        t0 = time.time()
+        design = Design.load_yaml(filename)
+        t1 = time.time()
+        if profile:
+            from popupcad.filetypes.profiling import RegenerationProfiler
+            profiler = RegenerationProfiler()
+            design.reprocessoperations(profiler = profiler)
+            result['profile'] = profiler.records
+        else:
+            design.reprocessoperations()
+        t2 = time.time()
+        for operation,output_index in find_outputs(design,selections):
+            for exportformat in exportformats or []:
+                result['exported'].extend(export_output(design,operation,output_index,exportformat,exportdir or design.dirname))
+        t3 = time.time()
+        result['load_time'] = t1-t0
+        result['regeneration_time'] = t2-t1
+        result['export_time'] = t3-t2
+        result['regeneration_count'] = design.regeneration_count
+    except Exception as ex:
+        result['error'] = '{0}: {1}'.format(type(ex).__name__,ex)
+    result['peak_memory'] = peak_memory()
+    return result
+
+def process_file_args(args):
+    return process_file(*args)
+
+def format_result(result):
+    if result['error'] != None:
+        return '{0}: failed ({1})'.format(result['filename'],result['error'])
+    s = '{0}: load {1:.2f}s, regenerate {2:.2f}s, export {3:.2f}s ({4:d} regenerated, {5:d} from cache, {6:d} files)'
+    s = s.format(result['filename'],result['load_time'],result['regeneration_time'],result['export_time'],result['regeneration_count'][0],result['regeneration_count'][1],len(result['exported']))
+    if result['peak_memory'] != None:
+        s+=', peak memory {0:.1f} MB'.format(result['peak_memory'])
+    return s
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog = 'popupcad batch',description = 'Regenerate popupCAD designs and export operation outputs without the editor.')
+    parser.add_argument('files',nargs = '+',help = 'design files (.cad) to regenerate')
+    parser.add_argument('-o','--operation',action = 'append',dest = 'operations',help = 'operation to export, as "name" or "name:output index".  may be repeated.  defaults to the last operation')
+    parser.add_argument('-f','--format',action = 'append',dest = 'formats',choices = export_formats,help = 'export format, may be repeated.  by default nothing is exported')
+    parser.add_argument('-d','--exportdir',default = None,help = 'directory for exported files.  defaults to the directory of each design')
+    parser.add_argument('-j','--jobs',type = int,default = 1,help = 'number of designs to process in parallel')
+    parser.add_argument('--no-cache',action = 'store_false',dest = 'use_cache',help = 'do not read or write the operation output cache')
+    parser.add_argument('--profile',default = None,help = 'profile each operation and write the results to this .csv or .json file')
+    return parser
+
+def main(argv = None):
+    '''run the batch command, returning the number of files which failed'''
+    args = build_parser().parse_args(argv)
+    if args.exportdir != None and not os.path.isdir(args.exportdir):
+        os.makedirs(args.exportdir)
+    jobs = [(os.path.abspath(filename),args.operations,args.formats,args.exportdir,args.use_cache,args.profile != None) for filename in args.files]
+
+    t0 = time.time()
+    failures = 0
+    records = []
+    if args.jobs>1:
+        import multiprocessing
+#        one design per worker process so that each peak memory figure belongs to a single file
+        pool = multiprocessing.Pool(args.jobs,maxtasksperchild = 1)
+        results = pool.imap(process_file_args,jobs)
+    else:
+        pool = None
+        results = map(process_file_args,jobs)
+    try:
+        for result in results:
+            if result['error'] != None:
+                failures+=1
+            for record in result.get('profile',[]):
+                record = record.copy()
+                record['filename'] = result['filename']
+                records.append(record)
+            print(format_result(result))
+            sys.stdout.flush()
+    finally:
+        if pool != None:
+            pool.close()
+            pool.join()
+    print('{0:d} files processed in {1:.2f}s, {2:d} failed'.format(len(jobs),time.time()-t0,failures))
+    if args.profile != None:
+        from popupcad.filetypes.profiling import save_records
+        save_records(args.profile,records,['filename'])
+    return failures
+
+if __name__=='__main__':
+    sys.exit(main()>0)
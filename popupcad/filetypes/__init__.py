@@ -6,6 +6,8 @@ Please see LICENSE.txt for full license.
 """
 
 from . import constraints
+from . import constraintcache
+from . import buffermemo
 from . import classtools
 from . import design
 from . import popupcad_file
@@ -18,8 +20,11 @@ from . import listwidgetitem
 from . import operation
 from . import operation2
 from . import operationoutput
+from . import outputcache
 from . import program
+from . import profiling
 from . import programsettings
+from . import scheduler
 from . import sketch
 from . import solidworksimport
 from . import undoredo
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+"""
+import collections
+import popupcad
+
+_active_memo = None
+
+class BufferMemo(object):
+    '''remembers the results of laminate buffers during one regeneration, keyed by the identities of the laminate's layers and the buffer arguments.
+    laminates which share layer objects, as the outputs of many operations do, share entries.
+    each entry holds on to its source layers, so that their ids cannot be reused while the entry exists,
+    and is only returned while the layers still hold the geometry it was computed from.
+    the least recently used entries are dropped beyond max_entries.'''
+    def __init__(self,max_entries):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(laminate,value,kwargs):
+        layers = tuple([id(laminate.layer_sequence[layer]) for layer in laminate.layerdef.layers])
+        return id(laminate.layerdef),layers,value,tuple(sorted(kwargs.items()))
+
+    def lookup(self,laminate,value,kwargs):
+        key = self.key(laminate,value,kwargs)
+        try:
+            state,result = self.entries[key]
+        except KeyError:
+            self.misses+=1
+            return None
+        if not laminate.has_layer_state(state):
+            del self.entries[key]
+            self.misses+=1
+            return None
+        self.entries.move_to_end(key)
+        self.hits+=1
+        return result
+
+    def store(self,laminate,value,kwargs,result):
+        self.entries[self.key(laminate,value,kwargs)] = (laminate.layer_state(),result)
+        while len(self.entries)>self.max_entries:
+            self.entries.popitem(last = False)
+
+    def clear(self):
+        self.entries.clear()
+
+def active_memo():
+    '''return the memo of the regeneration in progress, or None'''
+    return _active_memo
+
+def start():
+    '''start remembering buffers, returning the new memo, or None if one is already active (as when regenerating subdesigns)'''
+    global _active_memo
+    if _active_memo != None:
+        return None
+    try:
+        max_entries = popupcad.settings.buffer_memo_size
+    except AttributeError:
+        max_entries = popupcad.default_buffer_memo_size
+    if max_entries>0:
+        _active_memo = BufferMemo(max_entries)
+    return _active_memo
+
+def stop(memo):
+    '''clear and deactivate a memo returned by start()'''
+    global _active_memo
+    if memo != None:
+        memo.clear()
+        if _active_memo is memo:
+            _active_memo = None
+
+def reset():
+    '''forget any active memo without clearing it, as in a worker process which inherited its parent's memo when forked'''
+    global _active_memo
+    _active_memo = None
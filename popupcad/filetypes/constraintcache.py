@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+"""
+import os
+import math
+import pickle
+import hashlib
+import collections
+import numpy
+import scipy.sparse
+import sympy
+from sympy.printing.pycode import PythonCodePrinter
+import popupcad
+
+#increment whenever a change to the constraint equations invalidates previously compiled systems
+cache_version = 2
+
+_active_cache = None
+
+def signature(constraints,static_ids):
+    '''return a hashable description of a constraint set, from which its equations can be rebuilt.
+    static_ids are the ids of the reference vertices, whose coordinates are bound as constants rather than solved for.'''
+    constraint_ids = set([id1 for constraint in constraints for id1 in constraint.vertex_ids+constraint.vertices_in_lines()])
+    static_ids = tuple(sorted(constraint_ids.intersection(static_ids)))
+    return cache_version,popupcad.flip_y,popupcad.internal_argument_scaling,tuple([constraint.signature() for constraint in constraints]),static_ids
+
+def signature_hash(key):
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+class ConstraintPrinter(PythonCodePrinter):
+    '''prints constraint Variables as plain symbols.  without this, sympy mistakes them for its own codegen Variable, which shares the class name.'''
+    def _print_Variable(self,expr):
+        return self._print_Symbol(expr)
+
+def function_source(name,arguments,constants,lines):
+    source = ['def {0}(q,c):'.format(name)]
+    source.append('    [{0}] = q'.format(','.join([str(item) for item in arguments])))
+    source.append('    [{0}] = c'.format(','.join([str(item) for item in constants])))
+    source.extend(['    '+line for line in lines])
+    return '\n'.join(source)+'\n'
+
+class CompiledConstraints(object):
+    '''the residual and jacobian of a set of constraint equations, compiled to python functions of the
+    variable values q and constant values c.  the jacobian is compiled as the values of its nonzero entries,
+    whose rows and columns are kept alongside.  only the source of the functions is pickled.'''
+    def __init__(self,constraint_eqs,variables,constants):
+        self.constraint_eqs = constraint_eqs
+        self.variables = variables
+        self.constants = constants
+        self.allvariables = variables+constants
+
+        printer = ConstraintPrinter()
+        m = len(constraint_eqs)
+        n = len(variables)
+        J = constraint_eqs.jacobian(sympy.Matrix(variables))
+        lines = ['return numpy.array([{0}],dtype = float)'.format(','.join([printer.doprint(eq) for eq in constraint_eqs]))]
+        self.residual_source = function_source('residual',variables,constants,lines)
+        self.shape = m,n
+        entries = [(ii,jj,J[ii,jj]) for ii in range(m) for jj in range(n) if J[ii,jj]!=0]
+        self.jacobian_rows = numpy.array([ii for ii,jj,expr in entries],dtype = int)
+        self.jacobian_columns = numpy.array([jj for ii,jj,expr in entries],dtype = int)
+        lines = ['return numpy.array([{0}],dtype = float)'.format(','.join([printer.doprint(expr) for ii,jj,expr in entries]))]
+        self.jacobian_source = function_source('jacobian_values',variables,constants,lines)
+        self.compile()
+
+    @classmethod
+    def build(cls,constraints,static_ids):
+        '''derive the equations of a list of constraints, with the coordinates of the static vertices as constants'''
+        from popupcad.filetypes.constraints import SymbolicVertex,Variable
+        constants = set([symbol for id1 in static_ids for symbol in SymbolicVertex(id1).p()[:2]])
+        constraint_eqs = sympy.Matrix([equation for constraint in constraints for equation in constraint.generated_equations()])
+        allvariables = set([item for equation in constraint_eqs for item in list(equation.atoms(Variable))])
+        constants_in_eq = sorted(constants.intersection(allvariables),key = str)
+        variables = sorted(allvariables-constants,key = str)
+        return cls(constraint_eqs,variables,constants_in_eq)
+
+    def compile(self):
+        namespace = {'numpy':numpy,'math':math}
+        exec(self.residual_source,namespace)
+        exec(self.jacobian_source,namespace)
+        self.residual = namespace['residual']
+        self.jacobian_values = namespace['jacobian_values']
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['residual']
+        del state['jacobian_values']
+        return state
+
+    def __setstate__(self,state):
+        self.__dict__.update(state)
+        self.compile()
+
+    def jacobian(self,q,c):
+        J = numpy.zeros(self.shape)
+        J[self.jacobian_rows,self.jacobian_columns] = self.jacobian_values(q,c)
+        return J
+
+    def sparse_jacobian(self,q,c):
+        return scipy.sparse.coo_matrix((self.jacobian_values(q,c),(self.jacobian_rows,self.jacobian_columns)),shape = self.shape).tocsr()
+
+    def bind(self,constvals):
+        '''return the residual and jacobian as functions of the variables alone, for the given constant values.
+        both are zero-padded to be square.'''
+        c = list(constvals)
+        def dq(q):
+            zero = self.residual(q.flatten().tolist(),c)
+            n = len(zero)
+            m = len(q)
+            if m>n:
+                zero = numpy.r_[zero,[0]*(m-n)]
+            return zero
+        def j(q):
+            jnum = self.jacobian(q.flatten().tolist(),c)
+            m,n = jnum.shape
+            if n>m:
+                jnum = numpy.r_[jnum,numpy.zeros((n-m,n))]
+            return jnum
+        return dq,j
+
+    def bind_sparse(self,constvals):
+        '''return the residual and the jacobian as a sparse matrix, without padding, as functions of the variables alone'''
+        c = list(constvals)
+        def residual(q):
+            return self.residual(q.tolist(),c)
+        def jacobian(q):
+            return self.sparse_jacobian(q.tolist(),c)
+        return residual,jacobian
+
+class ConstraintCache(object):
+    '''remembers compiled constraint systems by signature, keeping the most recently used max_entries in memory.
+    if a directory is given, systems are also stored there and found again in later sessions.'''
+    extension = '.constraints'
+
+    def __init__(self,max_entries,directory = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if self.directory != None and not os.path.isdir(self.directory):
+            os.mkdir(self.directory)
+
+    def filename(self,key):
+        return os.path.normpath(os.path.join(self.directory,signature_hash(key)+self.extension))
+
+    def lookup(self,key):
+        try:
+            compiled = self.entries[key]
+            self.entries.move_to_end(key)
+            self.hits+=1
+            return compiled
+        except KeyError:
+            pass
+        compiled = self.load(key)
+        if compiled == None:
+            self.misses+=1
+            return None
+        self.hits+=1
+        self.remember(key,compiled)
+        return compiled
+
+    def remember(self,key,compiled):
+        self.entries[key] = compiled
+        while len(self.entries)>self.max_entries:
+            self.entries.popitem(last = False)
+
+    def store(self,key,compiled):
+        self.remember(key,compiled)
+        self.save(key,compiled)
+
+    def load(self,key):
+        if self.directory == None:
+            return None
+        filename = self.filename(key)
+        try:
+            with open(filename,'rb') as f:
+                stored_key,compiled = pickle.load(f)
+        except (IOError,EOFError,pickle.UnpicklingError):
+            return None
+        if stored_key!=key:
+            return None
+        os.utime(filename,None)
+        return compiled
+
+    def save(self,key,compiled):
+        if self.directory == None:
+            return
+        with open(self.filename(key),'wb') as f:
+            pickle.dump((key,compiled),f,pickle.HIGHEST_PROTOCOL)
+        self.evict()
+
+    def evict(self):
+        '''remove the least recently used files beyond max_entries'''
+        entries = []
+        for item in os.listdir(self.directory):
+            if item.endswith(self.extension):
+                filename = os.path.join(self.directory,item)
+                entries.append((os.stat(filename).st_mtime,filename))
+        entries.sort()
+        for mtime,filename in entries[:max(len(entries)-self.max_entries,0)]:
+            os.remove(filename)
+
+    def clear(self):
+        self.entries.clear()
+        if self.directory != None:
+            for item in os.listdir(self.directory):
+                if item.endswith(self.extension):
+                    os.remove(os.path.join(self.directory,item))
+
+def active_cache():
+    '''return the cache configured in the program settings, shared by every constraint system in this process, or None if it is disabled'''
+    global _active_cache
+    try:
+        max_entries = popupcad.settings.constraint_cache_size
+        on_disk = popupcad.settings.constraint_cache_on_disk
+    except AttributeError:
+        max_entries = popupcad.default_constraint_cache_size
+        on_disk = False
+    if max_entries<=0:
+        return None
+    if on_disk:
+        directory = os.path.normpath(os.path.join(popupcad.cachedir,'constraints'))
+    else:
+        directory = None
+    if _active_cache == None or _active_cache.max_entries!=max_entries or _active_cache.directory!=directory:
+        _active_cache = ConstraintCache(max_entries,directory)
+    return _active_cache
+
+def compile_constraints(constraints,static_ids):
+    '''return the compiled equations of a constraint set, from the cache where possible'''
+    cache = active_cache()
+    if cache == None:
+        return CompiledConstraints.build(constraints,static_ids)
+    key = signature(constraints,static_ids)
+    compiled = cache.lookup(key)
+    if compiled == None:
+        compiled = CompiledConstraints.build(constraints,key[-1])
+        cache.store(key,compiled)
+    return compiled
@@ -5,14 +5,17 @@ Email: danaukes<at>seas.harvard.edu.
 Please see LICENSE.txt for full license.
 """
 
+import math
 import sympy
 import scipy.integrate as integ
 import sympy.utilities 
 import numpy
 import PySide.QtGui as qg
 import scipy.optimize as opt
+import scipy.sparse.linalg
 import popupcad
 from dev_tools.enum import enum
+import popupcad.filetypes.numericconstraints as numeric
 
 internal_argument_scaling = popupcad.internal_argument_scaling
 
@@ -60,7 +63,8 @@ class ConstraintSystem(object):
         ini = {}
         vertexdict = {}
         for vertex in objects:
-            p = vertex.p()[0:2]
+            ref = vertex.constraints_ref()
+            p = [ref.symbol(0),ref.symbol(1)]
 
             vertexdict[p[0]]=vertex
             vertexdict[p[1]]=vertex
@@ -73,70 +77,71 @@ class ConstraintSystem(object):
     def regenerate(self):
         self.generated_variables = self.regenerate_inner()
         
-    def regenerate_inner(self):
-        from popupcad.geometry.vertex import BaseVertex,ReferenceVertex
+    def static_vertex_ids(self,objects):
+        '''return the ids of the reference vertices among objects, whose positions are constants of the system'''
+        from popupcad.geometry.vertex import ReferenceVertex
         from popupcad.geometry.line import Line
+        staticvertices = []
+        for item in objects:
+            if isinstance(item,ReferenceVertex):
+                staticvertices.append(item)
+            elif isinstance(item,Line):
+                if isinstance(item.vertex1,ReferenceVertex):
+                    staticvertices.append(item.vertex1)
+                if isinstance(item.vertex2,ReferenceVertex):
+                    staticvertices.append(item.vertex2)
+        return set([item.id for item in staticvertices])
+
+    def backend(self):
+        '''the equations to solve with, 'sympy' for compiled symbolic equations or 'numpy' for numeric ones'''
+        try:
+            return popupcad.settings.constraint_backend
+        except AttributeError:
+            return popupcad.default_constraint_backend
+
+    def regenerate_inner(self):
+        from popupcad.filetypes.constraintcache import compile_constraints
         
         if len(self.constraints)>0:
             objects = self.vertex_builder()
             if len(objects)>0:
-                variables,qout = [],[]
-                
-                staticvertices = []
-                for item in objects:
-                    if isinstance(item,ReferenceVertex):
-                        staticvertices.append(item)
-                    elif isinstance(item,Line):
-                        if isinstance(item.vertex1,ReferenceVertex):
-                            staticvertices.append(item.vertex1)
-                        if isinstance(item.vertex2,ReferenceVertex):
-                            staticvertices.append(item.vertex2)
-                constants = []
-                for item in staticvertices:
-                    constants.extend(SymbolicVertex(item.id).p()[:2])
-                constants = list(set(constants))
-    
-                constraint_eqs = sympy.Matrix([equation for constraint in self.constraints for equation in constraint.generated_equations()])
-                allvariables = list(set([item for equation in constraint_eqs for item in list(equation.atoms(Variable))]))
-                constants_in_eq = list(set(constants).intersection(allvariables))
-                variables = list(set(allvariables)-set(constants_in_eq))
-                J = constraint_eqs.jacobian(sympy.Matrix(variables))
-    
-                f_constraints1 = sympy.utilities.lambdify(constants_in_eq,constraint_eqs)
-                f_J_1 = sympy.utilities.lambdify(constants_in_eq,J)
+                if self.backend()=='numpy':
+                    return self.regenerate_numeric(objects)
+
+                compiled = compile_constraints(self.constraints,self.static_vertex_ids(objects))
     
                 ini,vertexdict = self.ini()
-                constvals = self.inilist(constants_in_eq,ini)
-    
-                f_constraints2 = sympy.utilities.lambdify(variables,sympy.Matrix(f_constraints1(*constvals)))
-                f_J_2 = sympy.utilities.lambdify(variables,sympy.Matrix(f_J_1(*constvals)))
-    
-                def dq(q):
-                    qlist = q.flatten().tolist()
-                    zero = f_constraints2(*(qlist))
-                    zero = numpy.array(zero[:]).flatten()
-                    n = len(zero)
-                    m = len(q)
-                    if m>n:
-                        zero = numpy.r_[zero,[0]*(m-n)]
-                    return zero        
-    
-                def j(q):
-                    qlist = q.flatten().tolist()
-                    jnum= f_J_2(*(qlist))
-                    jnum=numpy.array(jnum[:])
-                    m,n= jnum.shape
-                    if n>m:
-                        jnum= numpy.r_[jnum,numpy.zeros((n-m,n))]
-                    return jnum  
-                return dq,variables,j,vertexdict,constraint_eqs,constants_in_eq,allvariables
+                constvals = self.inilist(compiled.constants,ini)
+                dq,j = compiled.bind(constvals)
+                residual,sparse_jacobian = compiled.bind_sparse(constvals)
+                return dq,compiled.variables,j,vertexdict,compiled.constraint_eqs,compiled.constants,compiled.allvariables,residual,sparse_jacobian
         
+    def regenerate_numeric(self,objects):
+        system = numeric.NumericSystem(self.constraints,self.static_vertex_ids(objects))
+        system.bind(dict([(item.id,item.getpos()) for item in objects]))
+        ini,vertexdict = self.ini()
+        variables = [SymbolicVertex(id1).symbol(axis) for id1,axis in system.variables]
+        constants = [SymbolicVertex(id1).symbol(axis) for id1,axis in system.constants]
+        dq,j = system.padded()
+        return dq,variables,j,vertexdict,None,constants,variables+constants,system.residual,system.jacobian
+
+    def sparse(self,variables):
+        '''whether to solve with sparse jacobians, which is done above a number of variables set in the program settings'''
+        try:
+            threshold = popupcad.settings.constraint_sparse_threshold
+        except AttributeError:
+            threshold = popupcad.default_constraint_sparse_threshold
+        return len(variables)>threshold
+
     def update(self):
         try:
-            dq,variables,j,vertexdict,constraint_eqs,constants_in_eq,allvariables = self.generated_variables
+            dq,variables,j,vertexdict,constraint_eqs,constants_in_eq,allvariables,residual,sparse_jacobian = self.generated_variables
             ini,vertexdict = self.ini()
-            qout = opt.root(dq,numpy.array(self.inilist(variables,ini)),jac = j,tol = self.atol,method = 'lm')
-            qout = qout.x.tolist()
+            if self.sparse(variables):
+                qout = numeric.levenberg_marquardt(residual,sparse_jacobian,numpy.array(self.inilist(variables,ini)),tol = self.atol)
+            else:
+                qout = opt.root(dq,numpy.array(self.inilist(variables,ini)),jac = j,tol = self.atol,method = 'lm').x
+            qout = qout.tolist()
     
     #            qout = opt.newton_krylov(dq2,numpy.array(self.inilist(variables,ini)),f_tol = self.atol,f_rtol = self.rtol)
     #            qout = opt.anderson(dq2,numpy.array(self.inilist(variables,ini)),f_tol = self.atol,f_rtol = self.rtol)
@@ -154,7 +159,7 @@ class ConstraintSystem(object):
     def constrained_shift(self,items):
         ini,vertexdict = self.ini()
         try:
-            dq,variables,j,vertexdict,constraint_eqs,constants_in_eq,allvariables = self.generated_variables
+            dq,variables,j,vertexdict,constraint_eqs,constants_in_eq,allvariables,residual,sparse_jacobian = self.generated_variables
     
             dx_dict = {}
             for vertex,dxdy in items:
@@ -175,18 +180,21 @@ class ConstraintSystem(object):
                 
     
             x0 = numpy.array(self.inilist(variables,ini))
-            Jnum = j(x0)
-            import scipy
-            L,S,R = scipy.linalg.svd(Jnum)
-            aS = abs(S)
-            m = (aS>(aS[0]/100)).sum()
-            n = len(variables)
-            d = n-m
-            
-            rnull = R[m:]
-            lnull = ((rnull**2).sum(1))**.5
-            comp =   ((rnull*dx).sum(1))/lnull
-            x_motion = (comp*rnull.T).sum(1)
+            if self.sparse(variables):
+                x_motion = self.sparse_motion(sparse_jacobian(x0),dx)
+            else:
+                Jnum = j(x0)
+                import scipy
+                L,S,R = scipy.linalg.svd(Jnum)
+                aS = abs(S)
+                m = (aS>(aS[0]/100)).sum()
+                n = len(variables)
+                d = n-m
+                
+                rnull = R[m:]
+                lnull = ((rnull**2).sum(1))**.5
+                comp =   ((rnull*dx).sum(1))/lnull
+                x_motion = (comp*rnull.T).sum(1)
 
             x = x0 + x_motion
     
@@ -196,6 +204,19 @@ class ConstraintSystem(object):
             for vertex,dxdy in items:
                 vertex.shift(dxdy)
         
+    def sparse_motion(self,J,dx):
+        '''return the part of dx which keeps the constraints satisfied, removing its component in the row space of J.
+        as with the svd in constrained_shift, directions whose singular values are under 1/100 of the largest are
+        treated as free, here by damping the least squares fit of dx to the rows of J.'''
+        if J.nnz==0:
+            return dx
+        if min(J.shape)>1:
+            s0 = scipy.sparse.linalg.svds(J,k = 1,return_singular_vectors = False)[0]
+        else:
+            s0 = scipy.sparse.linalg.norm(J)
+        y = scipy.sparse.linalg.lsmr(J.T,dx,damp = s0/100)[0]
+        return dx-J.T.dot(y)
+
     def cleanup(self):
         sketch_objects = self.vertex_builder()
         for ii in range(len(self.constraints))[::-1]:
@@ -242,10 +263,10 @@ class AtLeastOnePoint(object):
 class SymbolicVertex(object):
     def __init__(self,id):
         self.id = id
+    def symbol(self,axis):
+        return Variable(str(self)+('_x','_y')[axis])
     def p(self):
-        p_x = Variable(str(self)+'_x')
-        p_y = Variable(str(self)+'_y')
-        return sympy.Matrix([p_x,p_y,0])
+        return sympy.Matrix([self.symbol(0),self.symbol(1),0])
     def __hash__(self):
         return self.id
     def __eq__(self,other):
@@ -297,6 +318,10 @@ class Constraint(object):
             obj.throwvalidityerror()
         return obj
 
+    def signature(self):
+        '''a hashable description of everything the equations depend on'''
+        return type(self).__name__,tuple(self.vertex_ids),tuple(self.segment_ids)
+
     def generated_equations(self):
         try:
             return self._generated_equations
@@ -376,6 +401,13 @@ class Constraint(object):
     def equations(self):
         return []
 
+    def numeric_rows(self):
+        '''return the equations as (kernel, vertex ids, parameters) rows of popupcad.filetypes.numericconstraints'''
+        return []
+
+    def line_ids(self):
+        return [tuple(item) for item in self.segment_ids]
+
     def properties(self):
         from dev_tools.propertyeditor import PropertyEditor
         return PropertyEditor(self)
@@ -424,6 +456,9 @@ class ValueConstraint(Constraint):
             new.id = self.id
         return new
 
+    def signature(self):
+        return super(ValueConstraint,self).signature()+(self.value,)
+
     @classmethod    
     def getValue(cls):
         return qg.QInputDialog.getDouble(None, 'Edit Value', 'Value', 0,-10000, 10000, 5)
@@ -468,6 +503,9 @@ class fixed(Constraint,AtLeastOnePoint):
             new.id = self.id
         return new
 
+    def signature(self):
+        return super(fixed,self).signature()+(tuple([tuple(item) for item in self.values]),)
+
     def equations(self):
         eqs = []
         for vertex,val in zip(self.getvertices(),self.values):
@@ -475,6 +513,9 @@ class fixed(Constraint,AtLeastOnePoint):
             eqs.append(vertex.p()[1] - val[1])
         return eqs         
 
+    def numeric_rows(self):
+        return [(numeric.PointOffset,(id1,),tuple(val)) for id1,val in zip(self.vertex_ids,self.values)]
+
 class horizontal(Constraint,AtLeastTwoPoints):
     name = 'horizontal'
     def equations(self):
@@ -485,6 +526,9 @@ class horizontal(Constraint,AtLeastTwoPoints):
         for vertex in vertices:
             eqs.append(vertex.p()[1] - p0[1])
         return eqs         
+    def numeric_rows(self):
+        ids = self.vertex_ids+self.vertices_in_lines()
+        return [(numeric.YDifference,(ids[0],id1),()) for id1 in ids[1:]]
 
 class vertical(Constraint,AtLeastTwoPoints):
     name = 'vertical'
@@ -496,6 +540,9 @@ class vertical(Constraint,AtLeastTwoPoints):
         for vertex in vertices:
             eqs.append(vertex.p()[0] - p0[0])
         return eqs
+    def numeric_rows(self):
+        ids = self.vertex_ids+self.vertices_in_lines()
+        return [(numeric.XDifference,(ids[0],id1),()) for id1 in ids[1:]]
 
 class distance(ValueConstraint,ExactlyTwoPoints):
     name = 'distance'
@@ -513,6 +560,11 @@ class distance(ValueConstraint,ExactlyTwoPoints):
             l1 = v1.dot(v1)**.5
             eq = l1 - self.value*internal_argument_scaling
             return [eq]  
+    def numeric_rows(self):
+        ids = self.vertex_ids+self.vertices_in_lines()
+        if self.value==0.:
+            return [(numeric.PointDifference,tuple(ids[0:2]),())]
+        return [(numeric.Distance,tuple(ids[0:2]),(self.value*internal_argument_scaling,))]
 
 class coincident(Constraint,AtLeastTwoPoints):
     name = 'coincident'
@@ -525,6 +577,9 @@ class coincident(Constraint,AtLeastTwoPoints):
             eq.append(p[0] - p0[0])
             eq.append(p[1] - p0[1])
         return eq
+    def numeric_rows(self):
+        ids = self.vertex_ids+self.vertices_in_lines()
+        return [(numeric.PointDifference,(ids[-1],id1),()) for id1 in ids[:-1]]
 
 class distancex(ValueConstraint,AtLeastOnePoint):
     name = 'distancex'
@@ -535,6 +590,11 @@ class distancex(ValueConstraint,AtLeastOnePoint):
         else:
             eq = ((vertices[1].p()[0]-vertices[0].p()[0])**2)**.5-((self.value*internal_argument_scaling)**2)**.5
         return [eq]
+    def numeric_rows(self):
+        ids = self.vertex_ids+self.vertices_in_lines()
+        if len(ids)==1:
+            return [(numeric.XOffset,tuple(ids),(self.value*internal_argument_scaling,))]
+        return [(numeric.XSeparation,tuple(ids[0:2]),(abs(self.value*internal_argument_scaling),))]
 
 class distancey(ValueConstraint,AtLeastOnePoint):
     name = 'distancey'
@@ -549,6 +609,15 @@ class distancey(ValueConstraint,AtLeastOnePoint):
         else:
             eq = ((vertices[1].p()[1]-vertices[0].p()[1])**2)**.5-((self.value*internal_argument_scaling)**2)**.5
         return [eq]
+    def numeric_rows(self):
+        ids = self.vertex_ids+self.vertices_in_lines()
+        if len(ids)==1:
+            if popupcad.flip_y:
+                temp = 1.
+            else:
+                temp = -1.
+            return [(numeric.YOffset,tuple(ids),(self.value*temp*internal_argument_scaling,))]
+        return [(numeric.YSeparation,tuple(ids[0:2]),(abs(self.value*internal_argument_scaling),))]
 
 class angle(ValueConstraint,AtLeastOneLine):
     name = 'angle'
@@ -575,6 +644,16 @@ class angle(ValueConstraint,AtLeastOneLine):
             elif len(lines)==2:
                 eq = v2[0]*v1[1] - v2[1]*v1[0]
         return [eq]     
+    def numeric_rows(self):
+        lines = self.line_ids()[0:2]
+        if self.value!=0:
+            s = math.sin(self.value*math.pi/180)
+            if len(lines)==1:
+                return [(numeric.AxisAngle,lines[0],(s,))]
+            return [(numeric.LineAngle,lines[0]+lines[1],(s,))]
+        if len(lines)==1:
+            return [(numeric.YDifference,lines[0],())]
+        return [(numeric.Cross,lines[0]+lines[1],())]
 
 class parallel(Constraint,AtLeastTwoLines):
     name = 'parallel'
@@ -586,6 +665,9 @@ class parallel(Constraint,AtLeastTwoLines):
             v2 = line.v()
             eq.append(v2[0]*v1[1] - v2[1]*v1[0])
         return eq
+    def numeric_rows(self):
+        lines = self.line_ids()
+        return [(numeric.Cross,lines[0]+line,()) for line in lines[1:]]
 
 class equal(Constraint,AtLeastTwoLines):
     name = 'equal'
@@ -598,6 +680,9 @@ class equal(Constraint,AtLeastTwoLines):
         for length in lengths:
             eqs.append(length0 - length)
         return eqs    
+    def numeric_rows(self):
+        lines = self.line_ids()
+        return [(numeric.EqualLength,lines[0]+line,()) for line in lines[1:]]
         
 class perpendicular(Constraint,ExactlyTwoLines):
     name = 'perpendicular'
@@ -606,6 +691,9 @@ class perpendicular(Constraint,ExactlyTwoLines):
         v1 = lines[0].v()
         v2 = lines[1].v()
         return [v2[1]*v1[1] + v2[0]*v1[0]]
+    def numeric_rows(self):
+        lines = self.line_ids()[0:2]
+        return [(numeric.Dot,lines[0]+lines[1],())]
 
 class PointLine(ValueConstraint,ExactlyOnePointOneLine):
     name = 'PointLineDistance'
@@ -628,6 +716,11 @@ class PointLine(ValueConstraint,ExactlyOnePointOneLine):
             l1 = v1.dot(v1)**.5
             eq = l1 - self.value*internal_argument_scaling
             return [eq]  
+    def numeric_rows(self):
+        ids = (self.vertex_ids[0],)+self.line_ids()[0]
+        if self.value==0.:
+            return [(numeric.PointLineProjection,ids,())]
+        return [(numeric.PointLineDistance,ids,(self.value*internal_argument_scaling,))]
 class LineMidpoint(Constraint,ExactlyOnePointOneLine):
     name = 'Line Midpoint'
     def equations(self):
@@ -639,6 +732,8 @@ class LineMidpoint(Constraint,ExactlyOnePointOneLine):
         eq.append(p1[0] - p0[0])
         eq.append(p1[1] - p0[1])
         return eq
+    def numeric_rows(self):
+        return [(numeric.Midpoint,(self.vertex_ids[0],)+self.line_ids()[0],())]
 
 if __name__=='__main__':
     a = SymbolicVertex(123)
@@ -48,9 +48,17 @@ class Design(popupCADFile):
             return self._layerdef
 
     def operation_index(self,operation_ref):
+        '''return the position of an operation in self.operations.
+        the id index is only rebuilt when it no longer agrees with the list, so it stays in sync however the list is edited'''
         try:
-            indeces = dict([(op.id,ii) for ii,op in enumerate(self.operations)])
-            return indeces[operation_ref]
+            ii = self._operation_index[operation_ref]
+            if self.operations[ii].id == operation_ref:
+                return ii
+        except (AttributeError,KeyError,IndexError):
+            pass
+        self._operation_index = dict([(op.id,ii) for ii,op in enumerate(self.operations)])
+        try:
+            return self._operation_index[operation_ref]
         except KeyError:
             raise(NoOperation)
 
@@ -122,8 +130,7 @@ class Design(popupCADFile):
         return prioroperations
 
     def layer_index(self,layer_ref):
-        indeces = dict([(layer.id,ii) for ii,layer in enumerate(self.return_layer_definition().layers)])
-        return indeces[layer_ref]
+        return self.return_layer_definition().getlayer_ii(layer_ref)
         
     def copy(self,identical = True):
         new = Design()
@@ -251,20 +258,77 @@ class Design(popupCADFile):
         else:
             self.subdesigns_reprocessed = setvalue
 
-    def reprocessoperations(self,operations = None):
+    def dirty_operations(self,operations):
+        '''return the set of operations which must be regenerated when the given operations change.  
+        operations without output (never generated, or cleared by an edit) are dirty as well, and so are all children of dirty operations.'''
+        self.network()
+        dirty = set(operations)
+        dirty.update([op for op in self.operations if not hasattr(op,'output')])
+        for op in list(dirty):
+            dirty.update(op.allchildren())
+        return dirty
+
+    def generate_operation(self,operation,cache = None,keys = None):
+        '''generate a single operation, through the output cache if one is given.  returns True on a cache hit.'''
+        if cache == None:
+            operation.generate(self)
+            return False
+        return cache.generate(self,operation,keys)
+
+    def reprocessoperations(self,operations = None,profiler = None):
+        memo = popupcad.filetypes.buffermemo.start()
+        try:
+            self.regenerate_operations(operations,profiler)
+        finally:
+            popupcad.filetypes.buffermemo.stop(memo)
+
+    def regenerate_operations(self,operations,profiler):
         if not self.subdesigns_are_reprocessed():
             for subdesign in self.subdesigns.values():
                 subdesign.reprocessoperations()
             self.subdesigns_are_reprocessed(True)
         
         if operations == None:
-            operations = self.operations
+            dirty = set(self.operations)
+        else:
+            dirty = self.dirty_operations(operations)
 
-#        operations2 = self.network().sortedallchildrenofnodes(operations)
-#        for op in operations2:
-        for op in self.operations:
-#            print(self._basename,op,self.operations.index(op))
-            op.generate(self)
+#        a profiled rebuild bypasses the output cache, so that the work of each operation is timed rather than a cache load
+        if profiler == None:
+            cache = popupcad.filetypes.outputcache.active_cache()
+        else:
+            cache = None
+        keys = {}
+
+        workers = popupcad.filetypes.scheduler.worker_count()
+        if workers>1 and profiler == None:
+            sequence = [op for op in self.operations if op in dirty]
+            regenerated,cached = popupcad.filetypes.scheduler.regenerate(self,sequence,workers,cache)
+            self.regeneration_count = regenerated,cached,len(self.operations)-len(sequence)
+            return
+
+        regenerated = 0
+        cached = 0
+        skipped = 0
+        if profiler != None:
+            profiler.start()
+        try:
+            for op in self.operations:
+                if op in dirty:
+                    if profiler == None:
+                        hit = self.generate_operation(op,cache,keys)
+                    else:
+                        hit = profiler.generate(self,op,cache,keys)
+                    if hit:
+                        cached+=1
+                    else:
+                        regenerated+=1
+                else:
+                    skipped+=1
+        finally:
+            if profiler != None:
+                profiler.stop()
+        self.regeneration_count = regenerated,cached,skipped
 
     def network(self):
         nodes = [op for op in self.operations]
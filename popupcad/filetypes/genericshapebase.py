@@ -32,6 +32,7 @@ class GenericShapeBase(popupCADFile):
     tolerance = 10.**-(roundvalue-1)
     shapetypes = enum(line = 'line',polyline = 'polyline',polygon = 'polygon',circle = 'circle',rect2point = 'rect2point')
     deletable = []
+    closed = False
 
     def __init__(self,exterior,interiors,construction = False,test_shapely = False):
         super(GenericShapeBase,self).__init__()
@@ -48,6 +49,63 @@ class GenericShapeBase(popupCADFile):
             if not shapely.is_valid:
                 raise(ShapeInvalid)
 
+    @classmethod
+    def compact(cls,exterior_p,interiors_p,construction = False):
+        '''create a shape which keeps its coordinates in one float array instead of vertex objects.
+        vertices are only built, once, when something asks for them, such as the sketcher's handles'''
+        import popupcad.algorithms.points as point_algorithms
+        rings = [cls.condition_array(point_algorithms.as_points(ring)) for ring in [exterior_p]+list(interiors_p)]
+        return cls.from_coordinates(numpy.concatenate(rings),numpy.cumsum([len(ring) for ring in rings]),construction)
+
+    @classmethod
+    def from_coordinates(cls,coordinates,ring_ends,construction = False):
+        new = cls.__new__(cls)
+        super(GenericShapeBase,new).__init__()
+        new._coordinates = coordinates
+        new._ring_ends = ring_ends
+        new.construction = construction
+        return new
+
+    @classmethod
+    def condition_array(cls,points):
+        import popupcad.algorithms.points as point_algorithms
+        redundant = point_algorithms.pairs_thesame(points,numpy.roll(points,-1,0),cls.tolerance)
+        return points[~redundant]
+
+    def share_shapely(self,other):
+        try:
+            self._shapely = other._shapely
+        except AttributeError:
+            pass
+
+    def source_shapely(self):
+        '''the shapely geometry a compact shape was generated from.  it is dropped when vertices are built, since they may then be edited'''
+        return self._shapely
+
+    def compact_rings(self):
+        rings = numpy.split(self._coordinates,self._ring_ends[:-1])
+        return [[tuple(point) for point in ring.tolist()] for ring in rings]
+
+    @staticmethod
+    def unpacked_state(state,rings):
+        '''replace the compact coordinates of an attribute dictionary with vertex lists'''
+        rings = [GenericShapeBase.buildvertexlist(ring) for ring in rings]
+        state['exterior'] = rings[0]
+        state['interiors'] = rings[1:]
+        del state['_coordinates']
+        del state['_ring_ends']
+        state.pop('_shapely',None)
+
+    def unpack_vertices(self):
+        self.unpacked_state(self.__dict__,self.compact_rings())
+
+    def __getstate__(self):
+        '''files store vertices.  a compact shape is unpacked for saving only, and stays compact itself'''
+        state = self.__dict__.copy()
+        if '_coordinates' in state:
+            self.unpacked_state(state,self.compact_rings())
+        return state
+
     @classmethod
     def lastdir(cls):
         return popupcad.lastshapedir
@@ -57,17 +115,25 @@ class GenericShapeBase(popupCADFile):
         popupcad.lastshapedir = directory
 
     def isValid(self):
-        notempty = len(self.get_exterior())>0
+        notempty = len(self.exteriorpoints())>0
         return notempty
 
     def copy_data(self,new_type,identical = True):
-        exterior = [vertex.copy(identical) for vertex in self.get_exterior()]
-        interiors = [[vertex.copy(identical) for vertex in interior] for interior in self.get_interiors()]
-        new = new_type(exterior,interiors,self.is_construction())
+        try:
+            new = new_type.from_coordinates(self._coordinates.copy(),self._ring_ends.copy(),self.is_construction())
+            if new_type==type(self):
+                new.share_shapely(self)
+        except AttributeError:
+            new = self.copy_vertices(new_type,identical)
         if identical:
             new.id = self.id
         self.copy_file_params(new,identical)
         return new
+
+    def copy_vertices(self,new_type,identical):
+        exterior = [vertex.copy(identical) for vertex in self.get_exterior()]
+        interiors = [[vertex.copy(identical) for vertex in interior] for interior in self.get_interiors()]
+        return new_type(exterior,interiors,self.is_construction())
         
     def copy(self,identical = True):
         return self.copy_data(type(self),identical)
@@ -82,9 +148,17 @@ class GenericShapeBase(popupCADFile):
         return new
 
     def get_exterior(self):
-        return self.exterior
+        try:
+            return self.exterior
+        except AttributeError:
+            self.unpack_vertices()
+            return self.exterior
     def get_interiors(self):
-        return self.interiors
+        try:
+            return self.interiors
+        except AttributeError:
+            self.unpack_vertices()
+            return self.interiors
 
     def is_construction(self):
         try:
@@ -94,10 +168,16 @@ class GenericShapeBase(popupCADFile):
             return self.construction
 
     def exteriorpoints(self):
-        return [vertex.getpos() for vertex in self.get_exterior()]        
+        try:
+            return self.compact_rings()[0]
+        except AttributeError:
+            return [vertex.getpos() for vertex in self.get_exterior()]        
         
     def interiorpoints(self):
-        return [[vertex.getpos() for vertex in interior] for interior in self.get_interiors()]
+        try:
+            return self.compact_rings()[1:]
+        except AttributeError:
+            return [[vertex.getpos() for vertex in interior] for interior in self.get_interiors()]
         
     def vertices(self):
         vertices = self.get_exterior()[:]
@@ -105,7 +185,10 @@ class GenericShapeBase(popupCADFile):
         return vertices
 
     def points(self):
-        return [vertex.getpos() for vertex in self.vertices()]        
+        try:
+            return [tuple(point) for point in self._coordinates.tolist()]
+        except AttributeError:
+            return [vertex.getpos() for vertex in self.vertices()]        
 
     def segments_closed(self):
         points = self.get_exterior()
@@ -122,9 +205,15 @@ class GenericShapeBase(popupCADFile):
         return segments
         
     def segmentpoints(self):
-        segments = self.segments()
-        segmentpoints = [(point1.getpos(),point2.getpos()) for point1,point2 in segments]
-        return segmentpoints
+        try:
+            rings = self.compact_rings()
+        except AttributeError:
+            segments = self.segments()
+            segmentpoints = [(point1.getpos(),point2.getpos()) for point1,point2 in segments]
+            return segmentpoints
+        if self.closed:
+            return [segment for ring in rings for segment in zip(ring,ring[1:]+ring[:1])]
+        return [segment for ring in rings for segment in zip(ring[:-1],ring[1:])]
 
     def painterpath(self):
         exterior = self.exteriorpoints()
@@ -140,14 +229,14 @@ class GenericShapeBase(popupCADFile):
         return PropertyEditor(self)
         
     def addvertex_exterior(self,vertex,special = False):
-        self.exterior.append(vertex)
+        self.get_exterior().append(vertex)
         self.update_handles()
         
     def removevertex(self,vertex):
-        if vertex in self.exterior:
+        if vertex in self.get_exterior():
             ii = self.exterior.index(vertex)
             self.exterior.pop(ii)
-        for interior in self.interiors:
+        for interior in self.get_interiors():
             if vertex in self.interior:
                 ii = interior.index(vertex)
                 interior.pop(ii)
@@ -167,10 +256,10 @@ class GenericShapeBase(popupCADFile):
         
     @classmethod
     def remove_redundant_points(cls,points):
-        newpoints = []
-        for point1,point2 in zip(points,points[1:]+points[0:1]):
-            if not cls.samepoint(point1.getpos(),point2.getpos()):
-                newpoints.append(point1)
+        import popupcad.algorithms.points as point_algorithms
+        positions = [point.getpos() for point in points]
+        redundant = point_algorithms.pairs_thesame(positions,positions[1:]+positions[0:1],cls.tolerance)
+        newpoints = [point for point,test in zip(points,redundant) if not test]
         return newpoints
 
     @classmethod
@@ -200,7 +289,6 @@ class GenericShapeBase(popupCADFile):
     def genfromshapely(cls,obj):
         from popupcad.filetypes.genericshapes import GenericPoly,GenericPolyline
         exterior_p,interiors_p = obj.genpoints_generic()
-        exterior,interiors = cls.buildvertices(exterior_p,interiors_p) 
         if isinstance(obj,customshapely.ShapelyPolygon):
             subclass = GenericPoly
         elif isinstance(obj,customshapely.ShapelyLineString):
@@ -213,7 +301,9 @@ class GenericShapeBase(popupCADFile):
         else:
             raise(Exception('unknown type'))
 
-        return subclass(exterior,interiors)
+        new = subclass.compact(exterior_p,interiors_p)
+        new._shapely = obj
+        return new
         
     @classmethod
     def gengenericpoly(cls,exterior_p,interiors_p,**kwargs):
@@ -269,6 +359,10 @@ class GenericShapeBase(popupCADFile):
         return poly
             
     def shape_is_equal(self,other):
+        try:
+            return self.compact_is_equal(other)
+        except AttributeError:
+            pass
         if type(self)==type(other):
             if len(self.get_exterior())==len(other.get_exterior()) and len(self.get_interiors())==len(other.get_interiors()):
                 for point1,point2 in zip(self.get_exterior(),other.get_exterior()):
@@ -283,6 +377,13 @@ class GenericShapeBase(popupCADFile):
                 return True
         return False
 
+    def compact_is_equal(self,other):
+        import popupcad.algorithms.points as point_algorithms
+        if type(self)==type(other):
+            if len(self._ring_ends)==len(other._ring_ends) and (self._ring_ends==other._ring_ends).all():
+                return bool(point_algorithms.pairs_thesame(self._coordinates,other._coordinates,self.tolerance).all())
+        return False
+
     def shift(self,dxdy):
         [item.shift(dxdy) for item in self.get_exterior()]
         [item.shift(dxdy) for interior in self.get_interiors() for item in interior]
@@ -301,6 +402,6 @@ class GenericShapeBase(popupCADFile):
     def fill(self):
         return self
     def insert_exterior_vertex(self,ii,vertex):
-        self.exterior.insert(ii,vertex)
+        self.get_exterior().insert(ii,vertex)
     def append_exterior_vertex(self,vertex):
-        self.exterior.append(vertex)
+        self.get_exterior().append(vertex)
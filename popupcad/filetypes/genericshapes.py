@@ -26,6 +26,10 @@ class GenericLine(GenericShapeBase):
         path.addPolygon(self.generateQPolygon(exterior))
         return path    
     def outputshapely(self):
+        try:
+            return self.source_shapely()
+        except AttributeError:
+            pass
         exterior_p = self.exteriorpoints()
         obj = customshapely.ShapelyLineString(exterior_p)
         return obj
@@ -44,6 +48,10 @@ class GenericPolyline(GenericShapeBase):
         path.addPolygon(self.generateQPolygon(exterior))
         return path    
     def outputshapely(self):
+        try:
+            return self.source_shapely()
+        except AttributeError:
+            pass
         exterior_p = self.exteriorpoints()
         obj = customshapely.ShapelyLineString(exterior_p)
         return obj        
@@ -53,6 +61,7 @@ class GenericPolyline(GenericShapeBase):
         return self.copy_data(GenericPoly,identical)
 
 class GenericPoly(GenericShapeBase):
+    closed = True
     def outputinteractive(self):
         from popupcad.graphics2d.interactive import InteractivePoly
         return InteractivePoly(self)
@@ -89,6 +98,10 @@ class GenericPoly(GenericShapeBase):
             tris = [[(tri.a.x,tri.a.y),(tri.b.x,tri.b.y),(tri.c.x,tri.c.y)] for tri in triangles]
         return tris
     def outputshapely(self):
+        try:
+            return self.source_shapely()
+        except AttributeError:
+            pass
         exterior_p = self.exteriorpoints()
         interiors_p = self.interiorpoints()
         obj = customshapely.ShapelyPolygon(exterior_p,interiors_p)
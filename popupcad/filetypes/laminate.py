@@ -4,11 +4,52 @@ Written by Daniel M. Aukes.
 Email: danaukes<at>seas.harvard.edu.
 Please see LICENSE.txt for full license.
 """
-import popupcad.geometry.customshapely as customshapely
 from popupcad.filetypes.genericshapebase import GenericShapeBase
 from popupcad.filetypes.layer import Layer
 import popupcad
 
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+_layer_executor = None
+_layer_executor_settings = None
+
+def layer_executor():
+    '''return the executor used to fan out per-layer work, as configured in the program settings, or None to run serially'''
+    global _layer_executor,_layer_executor_settings
+    try:
+        settings = popupcad.settings.layer_execution,popupcad.settings.layer_workers
+    except AttributeError:
+        return None
+    if settings != _layer_executor_settings:
+        import concurrent.futures
+        if _layer_executor != None:
+            _layer_executor.shutdown()
+        mode,workers = settings
+        if mode == 'threads':
+            _layer_executor = concurrent.futures.ThreadPoolExecutor(workers)
+        elif mode == 'processes':
+            _layer_executor = concurrent.futures.ProcessPoolExecutor(workers)
+        else:
+            _layer_executor = None
+        _layer_executor_settings = settings
+    return _layer_executor
+
+def layer_binaryoperation(layer1,layer2,function):
+    return layer1.binaryoperation(layer2,function)
+
+def layer_valueoperation(layer1,functionname,value,kwargs):
+    return layer1.valueoperation(functionname,value,**kwargs)
+
+def map_layers(function,*iterables):
+    '''apply function to each set of per-layer arguments, in parallel if enabled.  results are returned in layer order'''
+    executor = layer_executor()
+    if executor == None:
+        return list(map(function,*iterables))
+    return list(executor.map(function,*iterables))
+
 class IterableLaminate(object):
     def __getitem__(self,index):
         if isinstance(index,int):
@@ -47,6 +88,7 @@ class Laminate(IterableLaminate):
     def copy(self):
         new = type(self)(self.layerdef)
         new.layer_sequence = self.layer_sequence.copy()
+        return new
     def upgrade(self,*args,**kwargs):
         return self
     def layers(self):
@@ -55,8 +97,22 @@ class Laminate(IterableLaminate):
         return all([layer.isEmpty() for layer in self.layer_sequence.values()])
     def replacelayergeoms(self,layer,geoms):
         self.layer_sequence[layer] = Layer(geoms)
+    def replacelayer(self,layer,layerobject):
+        self.layer_sequence[layer] = layerobject
     def insertlayergeoms(self,layer,geoms):
-        self.layer_sequence[layer].add_geoms(geoms)
+#        layer objects are shared between laminates (by copy, layer operations and the keepout cache), so they are replaced rather than modified in place
+        self.layer_sequence[layer] = Layer(self.layer_sequence[layer].geoms+list(geoms))
+    def layer_state(self):
+        '''the layer objects and their merged geometry, for checking later that a result derived from this laminate is still current'''
+        return [(layer,layer.merged()) for layer in [self.layer_sequence[item] for item in self.layerdef.layers]]
+    def has_layer_state(self,state):
+        layers = [self.layer_sequence.get(item) for item in self.layerdef.layers]
+        if len(layers)!=len(state):
+            return False
+        for layer,(source,merged) in zip(layers,state):
+            if layer is not source or layer.merged() is not merged:
+                return False
+        return True
     def getlayer(self,ref):
         return self.layerdef.getlayer(ref)
 
@@ -71,7 +127,15 @@ class Laminate(IterableLaminate):
     def buffer(self,value,**kwargs):
         if not 'resolution' in kwargs:
             kwargs['resolution'] = popupcad.default_buffer_resolution
-        return self.valueoperation('buffer',value,**kwargs) 
+        from popupcad.filetypes.buffermemo import active_memo
+        memo = active_memo()
+        if memo == None:
+            return self.valueoperation('buffer',value,**kwargs) 
+        result = memo.lookup(self,value,kwargs)
+        if result == None:
+            result = self.valueoperation('buffer',value,**kwargs) 
+            memo.store(self,value,kwargs,result)
+        return result.copy()
     def cleanup(self,value):
         return popupcad.algorithms.morphology.cleanup(self,value,resolution = 1)
     def simplify(self,tolerance,**kwargs):
@@ -83,28 +147,51 @@ class Laminate(IterableLaminate):
         layers = self.layerdef.layers
         if self.layerdef!=ls2.layerdef:
             raise(Exception('layerdef must be the same'))
-        for layer in layers:
-            layer1 = self.layer_sequence[layer]
-            layer2 = ls2.layer_sequence[layer]
-            layerout = layer1.binaryoperation(layer2,function)
-            lsout.replacelayergeoms(layer,layerout.geoms)
+        layers1 = [self.layer_sequence[layer] for layer in layers]
+        layers2 = [ls2.layer_sequence[layer] for layer in layers]
+        results = map_layers(layer_binaryoperation,layers1,layers2,[function]*len(layers))
+        for layer,layerout in zip(layers,results):
+            lsout.replacelayer(layer,layerout)
         return lsout
 
     @staticmethod
     def unaryoperation(laminates,function):
+        '''combine a list of laminates with a binary function, in order.
+        unions are done with one unary union of all the geometry in each layer, differences subtract that union of the
+        remaining laminates from the first, and other functions are reduced pairwise as a balanced tree'''
+        lsout = laminates[0]
+        if len(laminates)==1:
+            return lsout
+        for laminate in laminates[1:]:
+            if laminate.layerdef!=lsout.layerdef:
+                raise(Exception('layerdef must be the same'))
+        if function=='union':
+            layers = lsout.layerdef.layers
+            layerlists = [[laminate.layer_sequence[layer] for laminate in laminates] for layer in layers]
+            results = map_layers(Layer.unary_union,layerlists)
+            lsout = Laminate(lsout.layerdef)
+            for layer,layerout in zip(layers,results):
+                lsout.replacelayer(layer,layerout)
+            return lsout
+        if function=='difference':
+            return lsout.binaryoperation(Laminate.unaryoperation(laminates[1:],'union'),function)
         laminates = laminates[:]
-        lsout = laminates.pop(0)
-        while not not laminates:
-            lsout = lsout.binaryoperation(laminates.pop(0),function)
-        return lsout
+        while len(laminates)>1:
+            pairs = zip(laminates[0::2],laminates[1::2])
+            reduced = [laminate1.binaryoperation(laminate2,function) for laminate1,laminate2 in pairs]
+            if len(laminates)%2:
+                reduced.append(laminates[-1])
+            laminates = reduced
+        return laminates[0]
 
     def valueoperation(self,functionname,value,**kwargs):
         lsout = Laminate(self.layerdef)
         layers = self.layerdef.layers
-        for layer in layers:
-            layer1 = self.layer_sequence[layer]
-            result = layer1.valueoperation(functionname,value,**kwargs)
-            lsout.replacelayergeoms(layer,result.geoms)
+        layers1 = [self.layer_sequence[layer] for layer in layers]
+        n = len(layers)
+        results = map_layers(layer_valueoperation,layers1,[functionname]*n,[value]*n,[kwargs]*n)
+        for layer,result in zip(layers,results):
+            lsout.replacelayer(layer,result)
         return lsout
     
     def unarylayeroperation(self,functionname,selectedinputlayers,selectedoutputlayers):   
@@ -113,11 +200,11 @@ class Laminate(IterableLaminate):
         for layer in selectedinputlayers:
             layer2 = self.layer_sequence[layer]
             layer1 = layer1.binaryoperation(layer2,functionname)
-        result = customshapely.unary_union_safe(layer1.geoms)
-        geoms1 = customshapely.multiinit(result)
+#        a single input layer never passes through GEOS, so it is merged here.  merged() is cached, so this costs nothing otherwise
+        layer1 = Layer.from_geos(layer1.merged())
         lsout = Laminate(self.layerdef)
         for layer in selectedoutputlayers:
-            lsout.replacelayergeoms(layer,geoms1)
+            lsout.replacelayer(layer,layer1)
         return lsout
 
     def binarylayeroperation2(self,function,layers1,layers2,outputlayers):
@@ -134,7 +221,7 @@ class Laminate(IterableLaminate):
         
         lsout = Laminate(self.layerdef)
         for layer in outputlayers:
-            lsout.replacelayergeoms(layer,layerout.geoms)
+            lsout.replacelayer(layer,layerout)
         return lsout    
 
     def select(self,layer):
@@ -150,8 +237,31 @@ class Laminate(IterableLaminate):
             genericgeometry[layer] = genericgeoms
         return genericgeometry
 
+    def generic_view(self):
+        return GenericGeometryView(self)
+
     def to_generic_laminate(self):
         from popupcad.filetypes.genericlaminate import GenericLaminate
         new = GenericLaminate(self.layerdef,self.genericfromls())
         return new
-        
+
+class GenericGeometryView(Mapping):
+    '''read-only mapping from layer to the generic shapes of a laminate.
+    a layer is converted from shapely the first time it is looked up, and the shapes keep their source geometry for outputshapely'''
+    def __init__(self,laminate):
+        self.laminate = laminate
+        self.generic_layers = {}
+
+    def __getitem__(self,layer):
+        try:
+            return self.generic_layers[layer]
+        except KeyError:
+            geoms = [GenericShapeBase.genfromshapely(geom) for geom in self.laminate.layer_sequence[layer].geoms]
+            self.generic_layers[layer] = geoms
+            return geoms
+
+    def __iter__(self):
+        return iter(self.laminate.layerdef.layers)
+
+    def __len__(self):
+        return len(self.laminate.layerdef.layers)
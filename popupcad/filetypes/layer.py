@@ -9,8 +9,21 @@ import shapely.geometry as sg
 import popupcad
 
 class Layer(object):
-    def __init__(self,geoms):
+    def __init__(self,geoms,merged = None):
         self.geoms = geoms
+        if merged is not None:
+            self._merged = merged
+
+    def merged(self):
+        '''return the union of this layer's geometry, computed once and cached until geometry is added'''
+        try:
+            return self._merged
+        except AttributeError:
+            if self.geoms == []:
+                self._merged = sg.Polygon()
+            else:
+                self._merged = customshapely.unary_union_safe(self.geoms)
+            return self._merged
 
     def union(self,layer):
         return self.binaryoperation(layer,'union')        
@@ -27,6 +40,10 @@ class Layer(object):
 
     def add_geoms(self,geoms):
         self.geoms.extend(geoms)
+        try:
+            del self._merged
+        except AttributeError:
+            pass
 
     def promote(self,layerdef):
         from popupcad.filetypes.laminate import Laminate
@@ -39,40 +56,25 @@ class Layer(object):
     def unary_union(cls,layers):
         geoms = [geom for layer in layers for geom in layer.geoms]
         result = customshapely.unary_union_safe(geoms)
-        return cls(customshapely.multiinit(result))
+        return cls(customshapely.multiinit(result),result)
+
+    @classmethod
+    def from_geos(cls,geom):
+        '''wrap the output of a GEOS operation, which is already unioned and becomes the cached merged geometry'''
+        return cls(customshapely.multiinit(geom),geom)
         
     def binaryoperation(self,layer2,functionname):
-        sourcegeoms = self.geoms
-        operationgeoms = layer2.geoms
-
-        if sourcegeoms ==[]:
-            sourcegeom = sg.Polygon()
-        else:
-            sourcegeom = customshapely.unary_union_safe(sourcegeoms)
-
-        if operationgeoms ==[]:
-            operationgeom = sg.Polygon()
-        else:
-            operationgeom = customshapely.unary_union_safe(operationgeoms)
-
+        sourcegeom = self.merged()
+        operationgeom = layer2.merged()
         function = getattr(sourcegeom,functionname)
         newgeom = function(operationgeom)
-
-        result = customshapely.unary_union_safe([newgeom])
-        return type(self)(customshapely.multiinit(result))
+        return type(self).from_geos(newgeom)
 
     def valueoperation(self,functionname,*args,**kwargs):
-        sourcegeoms  = self.geoms
-
-        if sourcegeoms ==[]:
-            sourcegeom = sg.Polygon()
-        else:
-            sourcegeom = customshapely.unary_union_safe(sourcegeoms)
-
+        sourcegeom = self.merged()
         function = getattr(sourcegeom,functionname)
         newgeom = function(*args,**kwargs)
-        result = customshapely.unary_union_safe([newgeom])
-        return type(self)(customshapely.multiinit(result))
+        return type(self).from_geos(newgeom)
 
     def isEmpty(self):
         return len(self.geoms)==0
\ No newline at end of file
@@ -27,12 +27,23 @@ class LayerDef(object):
         string = 'Laminate'
         return string
         
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_layer_index',None)
+        return state
+
     def getlayer(self,ref):
-        dict1 = dict([(item.id,item) for item in self.layers])
-        return dict1[ref]
+        return self.layers[self.getlayer_ii(ref)]
     def getlayer_ii(self,ref):
-        layer = self.getlayer(ref)
-        return self.layers.index(layer)
+        '''return the position of a layer.  the id index is only rebuilt when it no longer agrees with self.layers'''
+        try:
+            ii = self._layer_index[ref]
+            if self.layers[ii].id == ref:
+                return ii
+        except (AttributeError,KeyError,IndexError):
+            pass
+        self._layer_index = dict([(item.id,ii) for ii,item in enumerate(self.layers)])
+        return self._layer_index[ref]
         
     def neighbors(self,layer):   
         '''Find the layers above and below a given layer'''
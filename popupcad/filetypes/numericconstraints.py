@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+
+Numeric constraint equations, evaluated directly with numpy rather than through sympy.
+Each constraint breaks down into rows of a kernel, a vertex id for each of the kernel's points and a
+tuple of parameters.  Rows of the same kernel are evaluated together, each giving kernel.size residuals
+and their derivatives with respect to the x and y of each point.
+"""
+import numpy
+import scipy.sparse
+
+def norms(v):
+    return (v**2).sum(-1)**.5
+
+def safe_divide(a,b):
+    '''a/b, with zero wherever b is zero'''
+    b = numpy.where(b==0,numpy.inf,b)
+    return a/b
+
+class Kernel(object):
+    arity = 1
+    size = 1
+    uses = [[True,True]]
+
+    @classmethod
+    def blocks(cls,P):
+        return numpy.zeros((len(P),cls.size,cls.arity,2))
+
+    @classmethod
+    def evaluate(cls,P,values):
+        '''return the residuals (rows x size) and jacobian blocks (rows x size x arity x 2) at points P (rows x arity x 2)'''
+        raise(Exception('not implemented'))
+
+class PointOffset(Kernel):
+    '''p - value'''
+    size = 2
+    @classmethod
+    def evaluate(cls,P,values):
+        J = cls.blocks(P)
+        J[:,0,0,0] = 1
+        J[:,1,0,1] = 1
+        return P[:,0]-values,J
+
+class XOffset(Kernel):
+    '''p[axis] - value'''
+    axis = 0
+    uses = [[True,False]]
+    @classmethod
+    def evaluate(cls,P,values):
+        J = cls.blocks(P)
+        J[:,0,0,cls.axis] = 1
+        return P[:,0,cls.axis:cls.axis+1]-values,J
+
+class YOffset(XOffset):
+    axis = 1
+    uses = [[False,True]]
+
+class XDifference(Kernel):
+    '''p1[axis] - p0[axis]'''
+    arity = 2
+    axis = 0
+    uses = [[True,False],[True,False]]
+    @classmethod
+    def evaluate(cls,P,values):
+        J = cls.blocks(P)
+        J[:,0,0,cls.axis] = -1
+        J[:,0,1,cls.axis] = 1
+        return P[:,1,cls.axis:cls.axis+1]-P[:,0,cls.axis:cls.axis+1],J
+
+class YDifference(XDifference):
+    axis = 1
+    uses = [[False,True],[False,True]]
+
+class XSeparation(XDifference):
+    '''|p1[axis] - p0[axis]| - value'''
+    @classmethod
+    def evaluate(cls,P,values):
+        d,J = super(XSeparation,cls).evaluate(P,values)
+        sign = numpy.sign(d)
+        return abs(d)-values,J*sign[:,:,None,None]
+
+class YSeparation(XSeparation):
+    axis = 1
+    uses = [[False,True],[False,True]]
+
+class PointDifference(Kernel):
+    '''p1 - p0'''
+    arity = 2
+    size = 2
+    uses = [[True,True],[True,True]]
+    @classmethod
+    def evaluate(cls,P,values):
+        J = cls.blocks(P)
+        J[:,0,0,0] = -1
+        J[:,1,0,1] = -1
+        J[:,0,1,0] = 1
+        J[:,1,1,1] = 1
+        return P[:,1]-P[:,0],J
+
+class Distance(Kernel):
+    '''|p1 - p0| - value'''
+    arity = 2
+    uses = [[True,True],[True,True]]
+    @classmethod
+    def evaluate(cls,P,values):
+        d = P[:,1]-P[:,0]
+        l = norms(d)
+        u = safe_divide(d,l[:,None])
+        J = cls.blocks(P)
+        J[:,0,0] = -u
+        J[:,0,1] = u
+        return l[:,None]-values,J
+
+class LinePair(Kernel):
+    '''a function of the vectors v1 = b - a and v2 = d - c of lines (a,b) and (c,d)'''
+    arity = 4
+    uses = [[True,True]]*4
+    @classmethod
+    def vectors(cls,P):
+        return P[:,1]-P[:,0],P[:,3]-P[:,2]
+
+    @classmethod
+    def lineblocks(cls,P,dv1,dv2):
+        J = cls.blocks(P)
+        J[:,0,0] = -dv1
+        J[:,0,1] = dv1
+        J[:,0,2] = -dv2
+        J[:,0,3] = dv2
+        return J
+
+class Cross(LinePair):
+    '''v2.x*v1.y - v2.y*v1.x'''
+    @classmethod
+    def evaluate(cls,P,values):
+        v1,v2 = cls.vectors(P)
+        r = v2[:,0]*v1[:,1]-v2[:,1]*v1[:,0]
+        dv1 = numpy.c_[-v2[:,1],v2[:,0]]
+        dv2 = numpy.c_[v1[:,1],-v1[:,0]]
+        return r[:,None],cls.lineblocks(P,dv1,dv2)
+
+class Dot(LinePair):
+    '''v1.v2'''
+    @classmethod
+    def evaluate(cls,P,values):
+        v1,v2 = cls.vectors(P)
+        r = (v1*v2).sum(1)
+        return r[:,None],cls.lineblocks(P,v2,v1)
+
+class EqualLength(LinePair):
+    '''|v1| - |v2|'''
+    @classmethod
+    def evaluate(cls,P,values):
+        v1,v2 = cls.vectors(P)
+        l1 = norms(v1)
+        l2 = norms(v2)
+        return (l1-l2)[:,None],cls.lineblocks(P,safe_divide(v1,l1[:,None]),-safe_divide(v2,l2[:,None]))
+
+class LineAngle(LinePair):
+    '''|v1 x v2| - value*|v1|*|v2|, where value is the sine of the angle'''
+    @classmethod
+    def evaluate(cls,P,values):
+        v1,v2 = cls.vectors(P)
+        s = values[:,0]
+        c = v1[:,0]*v2[:,1]-v1[:,1]*v2[:,0]
+        sign = numpy.sign(c)[:,None]
+        l1 = norms(v1)
+        l2 = norms(v2)
+        dv1 = sign*numpy.c_[v2[:,1],-v2[:,0]]-(s*l2)[:,None]*safe_divide(v1,l1[:,None])
+        dv2 = sign*numpy.c_[-v1[:,1],v1[:,0]]-(s*l1)[:,None]*safe_divide(v2,l2[:,None])
+        return (abs(c)-s*l1*l2)[:,None],cls.lineblocks(P,dv1,dv2)
+
+class AxisAngle(Kernel):
+    '''|v.y| - value*|v| for the line (a,b), where value is the sine of the angle to the x axis'''
+    arity = 2
+    uses = [[True,True],[True,True]]
+    @classmethod
+    def evaluate(cls,P,values):
+        v = P[:,1]-P[:,0]
+        s = values[:,0]
+        l = norms(v)
+        dv = -s[:,None]*safe_divide(v,l[:,None])
+        dv[:,1]+=numpy.sign(v[:,1])
+        J = cls.blocks(P)
+        J[:,0,0] = -dv
+        J[:,0,1] = dv
+        return (abs(v[:,1])-s*l)[:,None],J
+
+class PointLineProjection(Kernel):
+    '''e = p - p0 for point p and line (a,b), where p0 is the projection of p onto the line'''
+    arity = 3
+    size = 2
+    uses = [[True,True]]*3
+    @classmethod
+    def project(cls,P):
+        w = P[:,0]-P[:,1]
+        v = P[:,2]-P[:,1]
+        s = (v**2).sum(1)
+        t = safe_divide((v*w).sum(1),s)
+        e = w-t[:,None]*v
+        return w,v,s,t,e
+
+    @classmethod
+    def evaluate(cls,P,values):
+        w,v,s,t,e = cls.project(P)
+        I = numpy.eye(2)[None]
+        de_dp = I-safe_divide(v[:,:,None]*v[:,None,:],s[:,None,None])
+        de_dv = -t[:,None,None]*I-safe_divide(v[:,:,None]*(w-2*t[:,None]*v)[:,None,:],s[:,None,None])
+        J = cls.blocks(P)
+        J[:,:,0] = de_dp
+        J[:,:,1] = -de_dp-de_dv
+        J[:,:,2] = de_dv
+        return e,J
+
+class PointLineDistance(PointLineProjection):
+    '''|e| - value, the distance from point p to line (a,b)'''
+    size = 1
+    @classmethod
+    def evaluate(cls,P,values):
+        w,v,s,t,e = cls.project(P)
+        l = norms(e)
+        u = safe_divide(e,l[:,None])
+        J = cls.blocks(P)
+        J[:,0,0] = u
+        J[:,0,1] = (t-1)[:,None]*u
+        J[:,0,2] = -t[:,None]*u
+        return l[:,None]-values,J
+
+class Midpoint(Kernel):
+    '''p - (a+b)/2'''
+    arity = 3
+    size = 2
+    uses = [[True,True]]*3
+    @classmethod
+    def evaluate(cls,P,values):
+        J = cls.blocks(P)
+        for ii in range(2):
+            J[:,ii,0,ii] = 1
+            J[:,ii,1,ii] = -.5
+            J[:,ii,2,ii] = -.5
+        return P[:,0]-(P[:,1]+P[:,2])/2,J
+
+class KernelGroup(object):
+    '''all the rows of one kernel, with the positions of their points in the coordinate vector'''
+    def __init__(self,kernel,slots,values,first_equation):
+        self.kernel = kernel
+        self.slots = numpy.array(slots,dtype = int).reshape((-1,kernel.arity))
+        self.values = numpy.array(values,dtype = float)
+        rows = len(self.slots)
+        self.equations = first_equation+numpy.arange(rows*kernel.size).reshape((rows,kernel.size))
+        coordinates = 2*self.slots[:,:,None]+numpy.arange(2)[None,None,:]
+        self.jacobian_rows = numpy.broadcast_to(self.equations[:,:,None,None],(rows,kernel.size,kernel.arity,2))
+        self.jacobian_coordinates = numpy.broadcast_to(coordinates[:,None],(rows,kernel.size,kernel.arity,2))
+
+    def evaluate(self,X):
+        return self.kernel.evaluate(X[self.slots],self.values)
+
+class NumericSystem(object):
+    '''the equations of a list of constraints, assembled into one residual vector and a sparse jacobian over the
+    coordinates of their vertices.  the coordinates of static_ids, and any coordinate no equation depends on,
+    are held at the positions given to bind().'''
+    def __init__(self,constraints,static_ids):
+        kernels = []
+        rows = {}
+        for constraint in constraints:
+            for kernel,ids,values in constraint.numeric_rows():
+                if not kernel in rows:
+                    kernels.append(kernel)
+                    rows[kernel] = []
+                rows[kernel].append((ids,values))
+
+        self.ids = []
+        slots = {}
+        used = set()
+        self.groups = []
+        m = 0
+        for kernel in kernels:
+            kernel_slots = []
+            for ids,values in rows[kernel]:
+                for id1,uses in zip(ids,kernel.uses):
+                    if not id1 in slots:
+                        slots[id1] = len(self.ids)
+                        self.ids.append(id1)
+                    kernel_slots.append(slots[id1])
+                    used.update([(id1,axis) for axis in range(2) if uses[axis]])
+            group = KernelGroup(kernel,kernel_slots,[values for ids,values in rows[kernel]],m)
+            self.groups.append(group)
+            m+=group.equations.size
+        self.num_equations = m
+
+        coordinates = [(id1,axis) for id1 in self.ids for axis in range(2)]
+        self.variables = [item for item in coordinates if item in used and not item[0] in static_ids]
+        self.constants = [item for item in coordinates if item in used and item[0] in static_ids]
+        self.variable_positions = numpy.array([2*slots[id1]+axis for id1,axis in self.variables],dtype = int)
+        columns = -numpy.ones(len(coordinates),dtype = int)
+        columns[self.variable_positions] = numpy.arange(len(self.variables))
+        for group in self.groups:
+            mask = numpy.array(group.kernel.uses,dtype = bool)[None,None]
+            group.jacobian_columns = columns[group.jacobian_coordinates]
+            group.jacobian_mask = (group.jacobian_columns>=0)&mask
+
+    def coordinates(self,positions):
+        '''return the coordinate vector of the given positions, a dictionary of (x,y) by vertex id'''
+        return numpy.array([positions[id1] for id1 in self.ids],dtype = float).reshape(-1)
+
+    def bind(self,positions):
+        '''hold the constant coordinates at positions, a dictionary of (x,y) by vertex id'''
+        self.x = self.coordinates(positions)
+
+    def initial(self):
+        return self.x[self.variable_positions]
+
+    def evaluate(self,q):
+        x = self.x.copy()
+        x[self.variable_positions] = q
+        X = x.reshape((-1,2))
+        return [group.evaluate(X) for group in self.groups]
+
+    def residual(self,q):
+        results = self.evaluate(q)
+        if not results:
+            return numpy.zeros(0)
+        return numpy.concatenate([r.reshape(-1) for r,J in results])
+
+    def jacobian(self,q):
+        '''return the jacobian as a sparse matrix'''
+        data,rows,columns = [],[],[]
+        for group,(r,J) in zip(self.groups,self.evaluate(q)):
+            mask = group.jacobian_mask
+            data.append(J[mask])
+            rows.append(group.jacobian_rows[mask])
+            columns.append(group.jacobian_columns[mask])
+        shape = (self.num_equations,len(self.variables))
+        if not data:
+            return scipy.sparse.csr_matrix(shape)
+        return scipy.sparse.coo_matrix((numpy.concatenate(data),(numpy.concatenate(rows),numpy.concatenate(columns))),shape = shape).tocsr()
+
+    def padded(self):
+        '''return the residual and dense jacobian as functions of the variables, both zero-padded to be square'''
+        def dq(q):
+            zero = self.residual(q.flatten())
+            n = len(zero)
+            m = len(q)
+            if m>n:
+                zero = numpy.r_[zero,[0]*(m-n)]
+            return zero
+        def j(q):
+            jnum = self.jacobian(q.flatten()).toarray()
+            m,n = jnum.shape
+            if n>m:
+                jnum = numpy.r_[jnum,numpy.zeros((n-m,n))]
+            return jnum
+        return dq,j
+
+def levenberg_marquardt(residual,jacobian,x0,tol = 1e-10,max_iterations = 100):
+    '''minimize |residual(x)|**2 from x0, where jacobian(x) returns a sparse matrix.
+    each step solves the damped normal equations with a sparse direct solver, so redundant constraints are allowed.
+    stops once a step is smaller than tol relative to the largest coordinate.'''
+    import scipy.sparse.linalg
+    x = numpy.array(x0,dtype = float)
+    r = residual(x)
+    cost = r.dot(r)
+    damping = None
+    for ii in range(max_iterations):
+        if cost==0:
+            break
+        J = jacobian(x)
+        A = (J.T*J).tocsc()
+        g = J.T*r
+        scale = max(abs(A.diagonal()).max(),1.)
+        if damping == None:
+            damping = 1e-6*scale
+        identity = scipy.sparse.identity(len(x),format = 'csc')
+        while True:
+            step = scipy.sparse.linalg.spsolve(A+damping*identity,-g)
+            r_new = residual(x+step)
+            cost_new = r_new.dot(r_new)
+            if cost_new<cost:
+                break
+            damping*=4
+            if damping>1e10*scale:
+                return x
+        x = x+step
+        r = r_new
+        cost = cost_new
+        damping = max(damping/4,1e-12*scale)
+        if abs(step).max()<=tol*(abs(x).max()+tol):
+            break
+    return x
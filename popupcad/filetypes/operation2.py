@@ -17,6 +17,8 @@ class Operation2(Node,UserData,ClassTools):
     attr_init = tuple()
     attr_init_k = tuple()
     attr_copy = tuple()
+#    operations whose generate() produces nothing but self.output can be cached and generated in worker processes
+    cacheable = True
     
     def __init__(self):
         Node.__init__(self)
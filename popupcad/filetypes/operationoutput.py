@@ -19,7 +19,7 @@ class OperationOutput(UserData):
         try:
             return self._generic_geometry_2d
         except AttributeError:
-            self._generic_geometry_2d = self.csg.genericfromls()
+            self._generic_geometry_2d = self.csg.generic_view()
             return self._generic_geometry_2d
 
     def controlpoints(self):
@@ -47,36 +47,36 @@ class OperationOutput(UserData):
         self._controlpoints, self._controllines,self._control_polygons = self.getcontrols(self.generic_geometry_2d())
         
     @staticmethod
-    def getcontrols(genericgeometry):
+    def shape_signature(geom):
+        '''hashable key of a shape's type and vertex positions, snapped to the shape tolerance.  shapes which are equal within tolerance almost always share a key'''
+        tolerance = geom.tolerance
+        exterior = tuple([(int(round(x/tolerance)),int(round(y/tolerance))) for x,y in geom.exteriorpoints()])
+        interiors = tuple([tuple([(int(round(x/tolerance)),int(round(y/tolerance))) for x,y in interior]) for interior in geom.interiorpoints()])
+        return type(geom),exterior,interiors
+
+    @classmethod
+    def getcontrols(cls,genericgeometry):
         from popupcad.geometry.line import ReferenceLine
         from popupcad.geometry.vertex import ReferenceVertex
-        vertices = []
+        vertex_index = {}
+        line_set = {}
         unique_geoms = []
-        all_geoms = []
-        lines = []
+        signatures = {}
         for layer, geoms in genericgeometry.items():
-            all_geoms.extend(geoms)
             for geom in geoms:
-                p = geom.points()
-                vertices.extend(p)
-                lines.extend(geom.segmentpoints())
-
-        for geom in all_geoms:
-            is_unique = True
-            for geom2 in unique_geoms:
-                if geom.shape_is_equal(geom2):
-                    is_unique = False
-                    break
-            if is_unique:
-                unique_geoms.append(geom)
-            
+                for p in geom.points():
+                    if not p in vertex_index:
+                        vertex_index[p] = len(vertex_index)
+                for line in geom.segmentpoints():
+                    line_set[line] = None
 
-        vertices = list(set(vertices))
-        controlpoints = [ReferenceVertex(position = p) for p in vertices]
+                candidates = signatures.setdefault(cls.shape_signature(geom),[])
+                if not any([geom.shape_is_equal(geom2) for geom2 in candidates]):
+                    candidates.append(geom)
+                    unique_geoms.append(geom)
 
-        lines = list(set(lines))
-        lines2 = [(vertices.index(p1),vertices.index(p2)) for p1,p2 in lines]
-        controllines = [ReferenceLine(controlpoints[ii],controlpoints[jj]) for ii,jj in lines2]
+        controlpoints = [ReferenceVertex(position = p) for p in vertex_index]
+        controllines = [ReferenceLine(controlpoints[vertex_index[p1]],controlpoints[vertex_index[p2]]) for p1,p2 in line_set]
         return controlpoints, controllines, unique_geoms
             
     def edit(self,*args,**kwargs):
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+"""
+import os
+import hashlib
+import pickle
+import yaml
+import shapely.wkb
+import popupcad
+import popupcad.geometry.customshapely as customshapely
+from popupcad.filetypes.laminate import Laminate
+from popupcad.filetypes.layer import Layer
+from popupcad.filetypes.operationoutput import OperationOutput
+
+#increment whenever a change to the geometry code invalidates previously cached results
+cache_version = 2
+
+def stable_hash(*objects):
+    '''hash the yaml representation of a set of objects'''
+    h = hashlib.sha1()
+    h.update(str(cache_version).encode())
+    for item in objects:
+        h.update(yaml.dump(item).encode())
+    return h.hexdigest()
+
+def operation_key(design,operation,keys,layerdef_key = None):
+    '''return the content key of an operation's outputs, or None if the operation cannot be cached.
+    keys is a dictionary of previously computed keys, which is updated in place.'''
+    try:
+        return keys[operation]
+    except KeyError:
+        pass
+
+    key = None
+    if getattr(operation,'cacheable',False):
+        parentkeys = [operation_key(design,design.op_from_ref(ref),keys,layerdef_key) for ref in operation.parentrefs()]
+        if not None in parentkeys:
+            if layerdef_key == None:
+                layerdef_key = stable_hash(design.return_layer_definition())
+            sketches = [design.sketches[ref].copy() for ref in operation.sketchrefs()]
+            subdesigns = [design.subdesigns[ref].copy() for ref in operation.subdesignrefs()]
+            key = stable_hash(operation.copy(),sketches,subdesigns,layerdef_key,parentkeys)
+    keys[operation] = key
+    return key
+
+def pack_layer(layer):
+    return [geom.wkb for geom in layer.geoms],layer.merged().wkb
+
+def pack_outputs(outputs):
+    '''convert a list of OperationOutputs to plain names and per-layer WKB of each layer's geometry and merged geometry, independent of any layer definition instance'''
+    unique = []
+    order = []
+    for output in outputs:
+        if not output in unique:
+            unique.append(output)
+        order.append(unique.index(output))
+    names = [output.name for output in unique]
+    layers = [[pack_layer(output.csg.layer_sequence[layer]) for layer in output.csg.layerdef.layers] for output in unique]
+    return names,layers,order
+
+def unpack_outputs(packed,layerdef,parent = None):
+    '''rebuild the list of OperationOutputs created by pack_outputs on the given layer definition'''
+    names,layers,order = packed
+    outputs = []
+    for name,layer_wkbs in zip(names,layers):
+        laminate = Laminate(layerdef)
+        for layer,(wkbs,merged) in zip(layerdef.layers,layer_wkbs):
+            geoms = [shapely.wkb.loads(item) for item in wkbs]
+            laminate.replacelayer(layer,Layer(customshapely.multiinit(*geoms),shapely.wkb.loads(merged)))
+        outputs.append(OperationOutput(laminate,name,parent))
+    return [outputs[ii] for ii in order]
+
+class OutputCache(object):
+    '''content-addressed on-disk store of operation outputs, evicted in least-recently-used order once size_limit (in bytes) is exceeded'''
+    extension = '.outputs'
+
+    def __init__(self,directory,size_limit):
+        self.directory = directory
+        self.size_limit = size_limit
+        if not os.path.isdir(self.directory):
+            os.mkdir(self.directory)
+
+    def filename(self,key):
+        return os.path.normpath(os.path.join(self.directory,key+self.extension))
+
+    def load(self,key,layerdef,parent = None):
+        '''return the list of OperationOutputs stored under key, or None on a miss'''
+        filename = self.filename(key)
+        try:
+            with open(filename,'rb') as f:
+                packed = pickle.load(f)
+        except (IOError,EOFError,pickle.UnpicklingError):
+            return None
+        os.utime(filename,None)
+        return unpack_outputs(packed,layerdef,parent)
+
+    def save(self,key,outputs):
+        '''store a list of OperationOutputs under key'''
+        with open(self.filename(key),'wb') as f:
+            pickle.dump(pack_outputs(outputs),f,pickle.HIGHEST_PROTOCOL)
+        self.evict()
+
+    def evict(self):
+        '''remove the least recently used entries until the cache fits within its size limit'''
+        entries = []
+        for item in os.listdir(self.directory):
+            if item.endswith(self.extension):
+                filename = os.path.join(self.directory,item)
+                stat = os.stat(filename)
+                entries.append((stat.st_mtime,stat.st_size,filename))
+        entries.sort()
+        total = sum([size for mtime,size,filename in entries])
+        while total>self.size_limit and len(entries)>1:
+            mtime,size,filename = entries.pop(0)
+            os.remove(filename)
+            total-=size
+
+    def clear(self):
+        for item in os.listdir(self.directory):
+            if item.endswith(self.extension):
+                os.remove(os.path.join(self.directory,item))
+
+    def restore(self,design,operation,keys):
+        '''restore an operation's output from the cache.  returns True on a cache hit.'''
+        key = operation_key(design,operation,keys)
+        if key != None:
+            outputs = self.load(key,design.return_layer_definition(),operation)
+            if outputs != None:
+                operation.output = outputs
+                return True
+        return False
+
+    def store(self,design,operation,keys):
+        key = operation_key(design,operation,keys)
+        if key != None:
+            self.save(key,operation.output)
+
+    def generate(self,design,operation,keys):
+        '''restore an operation's output from the cache, or generate and store it.  returns True on a cache hit.'''
+        if self.restore(design,operation,keys):
+            return True
+        operation.generate(design)
+        self.store(design,operation,keys)
+        return False
+
+def active_cache():
+    '''return the cache configured in the program settings, or None if caching is disabled'''
+    try:
+        enabled = popupcad.settings.output_cache_enabled
+        size_limit = popupcad.settings.output_cache_size
+    except AttributeError:
+        enabled = True
+        size_limit = popupcad.default_output_cache_size
+    if enabled:
+        return OutputCache(popupcad.cachedir,size_limit*1024*1024)
+    return None
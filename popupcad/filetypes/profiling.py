@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+"""
+import time
+import tracemalloc
+import shapely.ops
+import shapely.geometry.base
+
+fields = ['operation','type','cached','time','geos_operations','input_vertices','output_vertices','peak_memory']
+headings = ['Operation','Type','Cached','Time (s)','GEOS Operations','Input Vertices','Output Vertices','Peak Memory (MB)']
+
+geometry_methods = ['union','difference','intersection','symmetric_difference','buffer','simplify','contains','intersects','within','touches','overlaps','crosses','disjoint','distance','relate','equals']
+ops_functions = ['unary_union','cascaded_union','polygonize']
+
+def count_vertices(geom):
+    '''return the number of coordinates in a shapely geometry'''
+    try:
+        return sum([count_vertices(item) for item in geom.geoms])
+    except AttributeError:
+        pass
+    try:
+        return len(geom.exterior.coords)+sum([len(interior.coords) for interior in geom.interiors])
+    except AttributeError:
+        return len(geom.coords)
+
+def laminate_vertices(laminate):
+    return sum([count_vertices(geom) for layer in laminate.layerdef.layers for geom in laminate.layer_sequence[layer].geoms])
+
+def input_laminates(design,operation):
+    laminates = []
+    for values in operation.operation_links.values():
+        for ref,output_index in values:
+            laminates.append(design.op_from_ref(ref).output[output_index].csg)
+    return laminates
+
+def output_laminates(operation):
+    laminates = []
+    for output in operation.output:
+        if not any([output.csg is item for item in laminates]):
+            laminates.append(output.csg)
+    return laminates
+
+def reset_peak():
+    '''reset the peak of the traced memory, returning the memory currently traced.
+    tracemalloc.reset_peak is only available from python 3.9; before that, tracing is restarted, which also forgets earlier allocations.'''
+    try:
+        reset = tracemalloc.reset_peak
+    except AttributeError:
+        tracemalloc.stop()
+        tracemalloc.start()
+        return 0
+    reset()
+    return tracemalloc.get_traced_memory()[0]
+
+class RegenerationProfiler(object):
+    '''records the cost of each operation generated between start() and stop().
+    GEOS operations are counted by wrapping shapely's geometry methods while the profiler is running,
+    and peak memory is the extra Python heap (as traced by tracemalloc) used during each operation.
+    geometry work done in other processes is not counted.'''
+    def __init__(self):
+        self.records = []
+        self.geos_operations = 0
+        self.originals = []
+
+    def counted(self,function):
+        def wrapped(*args,**kwargs):
+            self.geos_operations+=1
+            return function(*args,**kwargs)
+        return wrapped
+
+    def start(self):
+        if self.originals:
+            return
+        for name in geometry_methods:
+            self.originals.append((shapely.geometry.base.BaseGeometry,name,getattr(shapely.geometry.base.BaseGeometry,name)))
+        for name in ops_functions:
+            self.originals.append((shapely.ops,name,getattr(shapely.ops,name)))
+        for owner,name,function in self.originals:
+            setattr(owner,name,self.counted(function))
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def stop(self):
+        for owner,name,function in self.originals:
+            setattr(owner,name,function)
+        self.originals = []
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def generate(self,design,operation,cache = None,keys = None):
+        '''generate an operation through design.generate_operation, recording its cost.  returns True on a cache hit.'''
+        try:
+            input_vertices = sum([laminate_vertices(laminate) for laminate in input_laminates(design,operation)])
+        except (AttributeError,IndexError):
+            input_vertices = None
+
+        self.geos_operations = 0
+        memory_before = reset_peak()
+        t0 = time.time()
+        cached = design.generate_operation(operation,cache,keys)
+        t1 = time.time()
+        memory_peak = tracemalloc.get_traced_memory()[1]
+
+        try:
+            output_vertices = sum([laminate_vertices(laminate) for laminate in output_laminates(operation)])
+        except AttributeError:
+            output_vertices = None
+
+        record = {}
+        record['operation'] = str(operation)
+        record['type'] = type(operation).__name__
+        record['cached'] = cached
+        record['time'] = t1-t0
+        record['geos_operations'] = self.geos_operations
+        record['input_vertices'] = input_vertices
+        record['output_vertices'] = output_vertices
+        record['peak_memory'] = (memory_peak-memory_before)/1024./1024.
+        self.records.append(record)
+        return cached
+
+    def total_time(self):
+        return sum([record['time'] for record in self.records])
+
+    def save(self,filename):
+        save_records(filename,self.records)
+
+def save_csv(filename,records,extra_fields = None):
+    import csv
+    with open(filename,'w',newline = '') as f:
+        writer = csv.DictWriter(f,(extra_fields or [])+fields)
+        writer.writeheader()
+        writer.writerows(records)
+
+def save_json(filename,records):
+    import json
+    with open(filename,'w') as f:
+        json.dump(records,f,indent = 1)
+
+def save_records(filename,records,extra_fields = None):
+    '''save profile records as csv or json, according to the extension of filename'''
+    if filename.lower().endswith('.json'):
+        save_json(filename,records)
+    else:
+        save_csv(filename,records,extra_fields)
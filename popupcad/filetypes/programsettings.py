@@ -5,6 +5,7 @@ Email: danaukes<at>seas.harvard.edu.
 Please see LICENSE.txt for full license.
 """
 
+import popupcad
 from popupcad.filetypes.popupcad_file import popupCADFile
 
 class ProgramSettings(popupCADFile):
@@ -26,6 +27,16 @@ class ProgramSettings(popupCADFile):
         self.id = id(self)
         self.nominal_width = 1024
         self.nominal_height = 768
+        self.output_cache_enabled = True
+        self.output_cache_size = popupcad.default_output_cache_size
+        self.regeneration_workers = 1
+        self.layer_execution = 'serial'
+        self.layer_workers = 4
+        self.buffer_memo_size = popupcad.default_buffer_memo_size
+        self.constraint_cache_size = popupcad.default_constraint_cache_size
+        self.constraint_cache_on_disk = False
+        self.constraint_backend = popupcad.default_constraint_backend
+        self.constraint_sparse_threshold = popupcad.default_constraint_sparse_threshold
 #        self.deprecated_mode = False
 
     def copy(self,identical = True):
@@ -35,6 +46,16 @@ class ProgramSettings(popupCADFile):
         new.toolbar_icon_size = self.toolbar_icon_size
         new.nominal_width=self.nominal_width
         new.nominal_height=self.nominal_height
+        new.output_cache_enabled=self.output_cache_enabled
+        new.output_cache_size=self.output_cache_size
+        new.regeneration_workers=self.regeneration_workers
+        new.layer_execution=self.layer_execution
+        new.layer_workers=self.layer_workers
+        new.buffer_memo_size=self.buffer_memo_size
+        new.constraint_cache_size=self.constraint_cache_size
+        new.constraint_cache_on_disk=self.constraint_cache_on_disk
+        new.constraint_backend=self.constraint_backend
+        new.constraint_sparse_threshold=self.constraint_sparse_threshold
 #        new.deprecated_mode=self.deprecated_mode
         if identical:
             new.id = self.id
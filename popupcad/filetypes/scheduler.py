@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+"""
+import concurrent.futures
+import popupcad
+import popupcad.filetypes.buffermemo
+from popupcad.filetypes.operationoutput import OperationOutput
+from popupcad.filetypes.outputcache import pack_outputs,unpack_outputs
+
+class ParentStub(object):
+    '''stands in for an already-generated parent operation in a worker process'''
+    def __init__(self,operation):
+        self.id = operation.id
+        self.output = [OperationOutput(item.csg,item.name) for item in operation.output]
+
+def worker_count():
+    '''return the number of regeneration processes configured in the program settings'''
+    try:
+        return popupcad.settings.regeneration_workers
+    except AttributeError:
+        return 1
+
+def runs_remotely(operation):
+    '''operations which only produce self.output and do not depend on subdesigns can be generated in another process'''
+    return getattr(operation,'cacheable',False) and len(operation.subdesignrefs())==0
+
+def detach(operation):
+    '''copy an operation without its network or output so that it can be sent to a worker'''
+    new = object.__new__(type(operation))
+    new.__dict__ = dict([(key,value) for key,value in operation.__dict__.items() if key not in ('network','output')])
+    return new
+
+def build_stub_design(design,operation,parents):
+    from popupcad.filetypes.design import Design
+    stub = Design()
+    stub.define_layers(design.return_layer_definition())
+    stub.sketches = dict([(ref,design.sketches[ref].copy()) for ref in operation.sketchrefs()])
+    stub.operations = [ParentStub(parent) for parent in parents]
+    stub.subdesigns_are_reprocessed(True)
+    return stub
+
+def generate_remote(stub,operation):
+#    a forked worker inherits the memo of the regeneration in progress, and a reused worker that of its last task
+    popupcad.filetypes.buffermemo.reset()
+    memo = popupcad.filetypes.buffermemo.start()
+    try:
+        operation.generate(stub)
+    finally:
+        popupcad.filetypes.buffermemo.stop(memo)
+    return pack_outputs(operation.output)
+
+def regenerate(design,operations,workers,cache = None):
+    '''generate the given operations (in a valid sequence) using a pool of worker processes.
+    each operation is started once all of its parents have finished.
+    returns the number of operations regenerated and the number restored from cache'''
+    keys = {}
+    layerdef = design.return_layer_definition()
+    parents = dict([(op,[design.op_from_ref(ref) for ref in op.parentrefs()]) for op in operations])
+    pending = operations[:]
+    waiting_on = set(operations)
+    running = {}
+    regenerated = 0
+    cached = 0
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        while pending or running:
+            ready = [op for op in pending if waiting_on.isdisjoint(parents[op])]
+            for op in ready:
+                pending.remove(op)
+                if cache != None and cache.restore(design,op,keys):
+                    cached+=1
+                    waiting_on.remove(op)
+                elif runs_remotely(op):
+                    stub = build_stub_design(design,op,parents[op])
+                    running[pool.submit(generate_remote,stub,detach(op))] = op
+                else:
+                    op.generate(design)
+                    regenerated+=1
+                    waiting_on.remove(op)
+                    if cache != None:
+                        cache.store(design,op,keys)
+            if ready and not running:
+                continue
+            if not running:
+                raise(Exception('operations cannot be scheduled: a parent is missing from the sequence'))
+
+            finished,unfinished = concurrent.futures.wait(list(running.keys()),return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                op = running.pop(future)
+                op.output = unpack_outputs(future.result(),layerdef,op)
+                regenerated+=1
+                waiting_on.remove(op)
+                if cache != None:
+                    cache.store(design,op,keys)
+    return regenerated,cached
@@ -7,4 +7,5 @@ Please see LICENSE.txt for full license.
 
 from . import customshapely
 from . import line
+from . import spatialindex
 from . import vertex
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+"""
+from shapely.strtree import STRtree
+
+class SpatialIndex(object):
+    '''STR-tree over a list of shapely geometries, returning the positions of candidates whose bounding boxes intersect a query'''
+    def __init__(self,geoms):
+        self.geoms = list(geoms)
+        self.positions = dict([(id(geom),ii) for ii,geom in enumerate(self.geoms)])
+        if self.geoms:
+            self.tree = STRtree(self.geoms)
+        else:
+            self.tree = None
+
+    def query(self,geom):
+        '''return the sorted positions of geometries whose bounding boxes intersect geom's'''
+        if self.tree == None:
+            return []
+        result = self.tree.query(geom)
+#        shapely 1.x returns the geometries themselves, shapely 2 returns their positions
+        return sorted([self.positions[id(item)] if hasattr(item,'geom_type') else int(item) for item in result])
+
+    def intersecting(self,geom):
+        '''return the positions of geometries which intersect geom'''
+        from shapely.prepared import prep
+        candidates = self.query(geom)
+        if len(candidates)>1:
+            geom = prep(geom)
+        return [ii for ii in candidates if geom.intersects(self.geoms[ii])]
+
+class DisjointSets(object):
+    '''union-find over hashable items, with path compression'''
+    def __init__(self,items):
+        self.parent = dict([(item,item) for item in items])
+
+    def root(self,item):
+        parent = self.parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        while parent[item] != root:
+            parent[item],item = root,parent[item]
+        return root
+
+    def join(self,item1,item2):
+        root1 = self.root(item1)
+        root2 = self.root(item2)
+        if root1 != root2:
+            self.parent[root2] = root1
+
+    def groups(self,items):
+        '''return the sets as lists, ordered by their first member in items, with members in the order of items'''
+        groups = {}
+        order = []
+        for item in items:
+            root = self.root(item)
+            if not root in groups:
+                groups[root] = []
+                order.append(root)
+            groups[root].append(item)
+        return [groups[root] for root in order]
@@ -81,7 +81,8 @@ class BaseVertex(object):
         return (self._pos[0],self._pos[1],0)
 
     def setsymbol(self,variable,value):
-        p = self.constraints_ref().p()
+        ref = self.constraints_ref()
+        p = ref.symbol(0),ref.symbol(1)
         if p[0] == variable:
             self.setpos((value,self.getpos()[1]))            
         if p[1] == variable:
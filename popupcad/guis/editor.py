@@ -170,6 +170,7 @@ class Editor(qg.QMainWindow,popupcad.widgets.widgetcommon.WidgetCommon):
 
         self.projectactions = []
         self.projectactions.append({'text':'&Rebuild','kwargs':{'icon':Icon('refresh'),'shortcut': qc.Qt.CTRL+qc.Qt.SHIFT+qc.Qt.Key_R,'triggered':self.reprocessoperations}})
+        self.projectactions.append({'text':'Rebuild with Profiling','kwargs':{'triggered':self.profileoperations}})
         def dummy(action):
             action.setCheckable(True)
             action.setChecked(True)
@@ -268,6 +269,7 @@ class Editor(qg.QMainWindow,popupcad.widgets.widgetcommon.WidgetCommon):
     def reprocessoperations(self,operations=None):
         try:
             self.design.reprocessoperations(operations)
+            self.statusBar().showMessage('{0:d} operations regenerated, {1:d} loaded from cache, {2:d} skipped'.format(*self.design.regeneration_count))
             self.operationeditor.refresh()
             self.showcurrentoutput()
             self.view_2d.zoomToFit()
@@ -276,6 +278,19 @@ class Editor(qg.QMainWindow,popupcad.widgets.widgetcommon.WidgetCommon):
         finally:
             self.operationeditor.refresh()
         
+    @loggable
+    def profileoperations(self):
+        from popupcad.filetypes.profiling import RegenerationProfiler
+        from popupcad.widgets.profiletable import ProfileTable
+        profiler = RegenerationProfiler()
+        try:
+            self.design.reprocessoperations(profiler = profiler)
+            self.showcurrentoutput()
+        finally:
+            self.operationeditor.refresh()
+        self.profiletable = ProfileTable(profiler)
+        self.profiletable.show()
+        
     @loggable
     def newfile(self):
         from popupcad.filetypes.layerdef import LayerDef
@@ -47,7 +47,8 @@ class Dialog(qg.QDialog):
         
     def acceptdata(self):
         ref,ii= self.le1.currentRefs()[0]
-        generic = self.design.op_from_ref(ref).output[ii].generic_geometry_2d()
+#        the operation saves this geometry, so it is copied out of the output's lazy view into a plain dictionary
+        generic = dict(self.design.op_from_ref(ref).output[ii].generic_geometry_2d())
         return ref,ii,generic
         
 class Flatten(Operation):
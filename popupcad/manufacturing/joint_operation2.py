@@ -16,6 +16,31 @@ from popupcad.filetypes.laminate import Laminate
 import popupcad_manufacturing_plugins
 from popupcad.widgets.table_editor import Table,SingleItemListElement,MultiItemListElement,FloatElement,Row
 
+def laminate_bounds(laminate):
+    '''return the bounding box of all of a laminate's layers, or None if it is empty'''
+    bounds = [laminate.layer_sequence[layer].merged().bounds for layer in laminate.layerdef.layers]
+    bounds = [item for item in bounds if item]
+    if not bounds:
+        return None
+    return min([item[0] for item in bounds]),min([item[1] for item in bounds]),max([item[2] for item in bounds]),max([item[3] for item in bounds])
+
+def find_neighbors(laminates,distance):
+    '''for each laminate, return the positions of the other laminates whose bounding boxes come within distance of its own.
+    any laminate whose geometry, buffered by distance, reaches another is among its neighbors.'''
+    from shapely.geometry import box
+    from popupcad.geometry.spatialindex import SpatialIndex
+    allbounds = [laminate_bounds(laminate) for laminate in laminates]
+    positions = [ii for ii,bounds in enumerate(allbounds) if bounds != None]
+    index = SpatialIndex([box(*allbounds[ii]) for ii in positions])
+    neighbors = []
+    for ii,bounds in enumerate(allbounds):
+        if bounds == None:
+            neighbors.append([])
+        else:
+            query = box(*bounds).buffer(distance,resolution = 1,join_style = 2)
+            neighbors.append([positions[jj] for jj in index.query(query) if positions[jj]!=ii])
+    return neighbors
+
 class JointRow(Row):
     def __init__(self,get_sketches,get_layers):
         elements = []
@@ -143,6 +168,8 @@ class JointOperation2(Operation2,LayerBasedOperation):
     resolution = 2
     
     name = 'Joint Operation'
+    cacheable = False
+
     def copy(self):
         new = type(self)(self.operation_links,[item.copy() for item in self.joint_defs])
         new.id = self.id
@@ -236,10 +263,13 @@ class JointOperation2(Operation2,LayerBasedOperation):
             all_joint_props.extend(joint_props)
             
         safe_sections = []
-        for ii in range(len(allgeoms)):
-            unsafe = Laminate.unaryoperation(allgeoms[:ii]+allgeoms[ii+1:],'union')
-            unsafe_buffer = unsafe.buffer(safe_buffer1,resolution = self.resolution)
-            safe_sections.append(allgeoms[ii].difference(unsafe_buffer))
+        for ii,neighbors in enumerate(find_neighbors(allgeoms,safe_buffer1)):
+            if neighbors:
+                unsafe = Laminate.unaryoperation([allgeoms[jj] for jj in neighbors],'union')
+                unsafe_buffer = unsafe.buffer(safe_buffer1,resolution = self.resolution)
+                safe_sections.append(allgeoms[ii].difference(unsafe_buffer))
+            else:
+                safe_sections.append(allgeoms[ii])
             
         safe = Laminate.unaryoperation(safe_sections,'union')
         buffered_splits2 = Laminate.unaryoperation(buffered_splits,'union')
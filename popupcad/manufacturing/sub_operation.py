@@ -128,6 +128,7 @@ class MainWidget(qg.QDialog):
 class SubOperation(Operation2):
     resolution = 2
     name = 'Sub-Operation'
+    cacheable = False
     def copy(self):
         new = type(self)(self.design_links.copy(),self.input_list.copy(),self.output_list.copy())
         new.id = self.id
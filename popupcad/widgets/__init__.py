@@ -16,6 +16,7 @@ from . import errorlog
 from . import dragndroplist
 from . import dragndroptree
 from . import listmanager
+from . import profiletable
 from . import materialselection
 from . import materialselection2
 from . import simplescene
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+"""
+
+import PySide.QtGui as qg
+import PySide.QtCore as qc
+from popupcad.filetypes.profiling import fields,headings
+
+class ProfileTable(qg.QWidget):
+    '''sortable table of the per-operation records from a RegenerationProfiler'''
+    def __init__(self,profiler,*args,**kwargs):
+        super(ProfileTable,self).__init__(*args,**kwargs)
+        self.profiler = profiler
+        self.setWindowTitle('Regeneration Profile')
+
+        self.table = qg.QTableWidget(len(profiler.records),len(fields))
+        self.table.setHorizontalHeaderLabels(headings)
+        for ii,record in enumerate(profiler.records):
+            for jj,field in enumerate(fields):
+                item = qg.QTableWidgetItem()
+                value = record[field]
+                if isinstance(value,float):
+                    value = round(value,4)
+#                numbers are stored as numbers so that columns sort numerically
+                item.setData(qc.Qt.DisplayRole,value)
+                item.setFlags(item.flags() & ~qc.Qt.ItemIsEditable)
+                self.table.setItem(ii,jj,item)
+        self.table.setSortingEnabled(True)
+        self.table.sortItems(fields.index('time'),qc.Qt.DescendingOrder)
+        self.table.resizeColumnsToContents()
+
+        self.label = qg.QLabel('{0:d} operations, {1:.3f}s'.format(len(profiler.records),profiler.total_time()))
+        button = qg.QPushButton('Export...')
+        button.clicked.connect(self.export)
+
+        layout2 = qg.QHBoxLayout()
+        layout2.addWidget(self.label)
+        layout2.addStretch()
+        layout2.addWidget(button)
+        layout = qg.QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addLayout(layout2)
+        self.setLayout(layout)
+
+    def export(self):
+        filename, selectedfilter = qg.QFileDialog.getSaveFileName(self,'Export Profile','profile.csv',filter = 'CSV (*.csv);;JSON (*.json)')
+        if filename:
+            self.profiler.save(filename)
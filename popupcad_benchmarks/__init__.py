@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+"""
+
+from . import acyclicdirectedgraph
+from . import constraints
+from . import geometry
+from . import laminate_layers
+from . import layer_unions
+from . import synthetic
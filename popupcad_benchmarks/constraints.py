@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+
+Compare the sympy and numpy constraint backends on seeded synthetic sketches.
+Each cell of a sketch is a rectangle with a few attached points and lines, constrained with every constraint type,
+and chained to the previous cell, so that the whole sketch is well constrained.  Vertices start from randomly
+perturbed positions; the solved positions of each backend are compared.  After solving, one vertex is dragged with
+ConstraintSystem.constrained_shift.  Sketches with more variables than constraint_sparse_threshold are solved with sparse jacobians.
+The sympy backend is only run up to --sympy-limit constraints, since deriving its jacobian grows quickly with size.
+
+Run with: python -m popupcad_benchmarks.constraints [--cells 10 60 120] [--sympy-limit 200]
+"""
+import math
+import time
+import random
+import argparse
+import numpy
+import popupcad
+import popupcad.filetypes.constraints as constraints
+from popupcad.filetypes.constraints import ConstraintSystem,Constraint
+from popupcad.geometry.vertex import ShapeVertex,ReferenceVertex
+from popupcad.geometry.line import ShapeLine
+
+def cell(ii,rng,noise,previous):
+    '''return the vertices and constraints of the ii-th cell, chained to the vertices of the previous cell (or a reference vertex)'''
+    s = popupcad.internal_argument_scaling
+    x0 = 3.*ii
+    c30 = math.cos(math.pi/6)
+    c45 = math.cos(math.pi/4)
+    exact = [(x0,0),(x0+2,0),(x0+2,1),(x0,1),(x0+1,1),(x0+1.5,1),(x0,.5),(x0+2+c30,1.5),(x0+c45,1+c45)]
+    vertices = [ShapeVertex(((x+rng.uniform(-noise,noise))*s,(y+rng.uniform(-noise,noise))*s)) for x,y in exact]
+    v0,v1,v2,v3,m,p,q,w,u = vertices
+    l0,l1,l2,l3 = [ShapeLine(vertices[jj],vertices[(jj+1)%4]) for jj in range(4)]
+    l4 = ShapeLine(v2,w)
+    l5 = ShapeLine(v3,u)
+
+    def ids(*objects):
+        return Constraint._define_internals(*objects)
+
+    items = []
+    items.append(constraints.horizontal(*ids(l0)))
+    items.append(constraints.vertical(*ids(l1)))
+    items.append(constraints.parallel(*ids(l0,l2)))
+    items.append(constraints.equal(*ids(l0,l2)))
+    items.append(constraints.perpendicular(*ids(l0,l3)))
+    items.append(constraints.distance(2.,*ids(v0,v1)))
+    items.append(constraints.distancey(1.,*ids(v1,v2)))
+    items.append(constraints.LineMidpoint(*ids(m,l2)))
+    items.append(constraints.PointLine(.5,*ids(p,l1)))
+    items.append(constraints.horizontal(*ids(m,p)))
+    items.append(constraints.PointLine(0.,*ids(q,l3)))
+    items.append(constraints.distance(.5,*ids(v0,q)))
+    items.append(constraints.angle(30.,*ids(l0,l4)))
+    items.append(constraints.distance(1.,*ids(v2,w)))
+    items.append(constraints.angle(45.,*ids(l5)))
+    items.append(constraints.distance(1.,*ids(v3,u)))
+    if ii==0:
+        reference = previous[0]
+        items.append(constraints.coincident(*ids(reference,v0)))
+        items.append(constraints.fixed([v1.id],[(2*s,0.)]))
+        items.append(constraints.distancex(0.,*ids(v0)))
+        items.append(constraints.distancey(0.,*ids(v0)))
+    else:
+        items.append(constraints.horizontal(*ids(previous[0],v0)))
+        items.append(constraints.distancex(1.,*ids(previous[1],v0)))
+        items.append(constraints.angle(0.,*ids(ShapeLine(previous[3],v3))))
+    return vertices,items
+
+def constrained_sketch(num_cells,seed = 0,noise = .05):
+    '''return the vertices and constraints of a chain of num_cells cells, starting from a reference vertex at the origin'''
+    rng = random.Random(seed)
+    reference = ReferenceVertex((0.,0.))
+    allvertices = [reference]
+    allconstraints = []
+    previous = [reference]
+    for ii in range(num_cells):
+        vertices,items = cell(ii,rng,noise,previous)
+        allvertices.extend(vertices)
+        allconstraints.extend(items)
+        previous = vertices
+    return allvertices,allconstraints
+
+def solve(backend,vertices,items):
+    '''regenerate, solve and drag a copy of the sketch with one backend, returning the times taken and the solved positions by id'''
+    vertices = [vertex.copy(identical = True) for vertex in vertices]
+    system = ConstraintSystem()
+    system.constraints = [item.copy() for item in items]
+    system.link_vertex_builder(lambda:vertices)
+    original = getattr(popupcad.settings,'constraint_backend',None)
+    popupcad.settings.constraint_backend = backend
+    try:
+        t0 = time.time()
+        system.regenerate()
+        t1 = time.time()
+        system.update()
+        t2 = time.time()
+        positions = dict([(vertex.id,vertex.getpos()) for vertex in vertices])
+        system.constrained_shift([(vertices[-1],(.1*popupcad.internal_argument_scaling,0.))])
+        t3 = time.time()
+    finally:
+        popupcad.settings.constraint_backend = original
+    return t1-t0,t2-t1,t3-t2,positions
+
+def max_residual(vertices,items,positions):
+    '''the largest residual of the numeric equations at the given positions'''
+    from popupcad.filetypes.numericconstraints import NumericSystem
+    system = NumericSystem(items,set([vertex.id for vertex in vertices if isinstance(vertex,ReferenceVertex)]))
+    system.bind(positions)
+    return abs(system.residual(system.initial())).max()
+
+def run(cells = (10,60,120),sympy_limit = 200,seed = 0):
+    results = []
+    for num_cells in cells:
+        vertices,items = constrained_sketch(num_cells,seed)
+        result = {'cells':num_cells,'constraints':len(items),'vertices':len(vertices)}
+        backends = ['numpy']
+        if len(items)<=sympy_limit:
+            backends.append('sympy')
+        positions = {}
+        for backend in backends:
+            regenerate_time,solve_time,drag_time,positions[backend] = solve(backend,vertices,items)
+            result[backend] = regenerate_time,solve_time,drag_time,max_residual(vertices,items,positions[backend])
+        s = '{0:5d} constraints {1:5d} vertices'.format(len(items),len(vertices))
+        for backend in backends:
+            s+='  {0}: regenerate {1:.3f}s solve {2:.3f}s drag {3:.3f}s residual {4:.2g}'.format(backend,*result[backend])
+        if 'sympy' in positions:
+            a = numpy.array([positions['numpy'][vertex.id] for vertex in vertices])
+            b = numpy.array([positions['sympy'][vertex.id] for vertex in vertices])
+            result['difference'] = abs(a-b).max()
+            s+='  difference {0:.2g}'.format(result['difference'])
+        print(s)
+        results.append(result)
+    return results
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description = 'Compare the sympy and numpy constraint backends.')
+    parser.add_argument('--cells',type = int,nargs = '+',default = [10,60,120],help = 'numbers of cells to try, each with about 17 constraints')
+    parser.add_argument('--sympy-limit',type = int,default = 200,dest = 'sympy_limit',help = 'largest number of constraints to solve with the sympy backend')
+    parser.add_argument('--seed',type = int,default = 0)
+    args = parser.parse_args()
+    run(args.cells,args.sympy_limit,args.seed)
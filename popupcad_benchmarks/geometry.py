@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+
+Scaling benchmarks for the laminate CSG core, run on seeded synthetic laminates.
+Each parameter (layers, polygons, vertices, holes) is varied in turn while the others are held at their base values.
+Results are written as JSON so that runs on different commits can be compared.
+
+Run with: python -m popupcad_benchmarks.geometry [-o results.json] [--quick]
+Compare with: python -m popupcad_benchmarks.geometry --compare old.json new.json
+"""
+import sys
+import time
+import json
+import argparse
+import subprocess
+import numpy
+import shapely
+import popupcad
+from popupcad.algorithms import keepout
+from popupcad.filetypes.operationoutput import OperationOutput
+from popupcad_manufacturing_plugins.algorithms import removability,bodydetection
+from popupcad_benchmarks import synthetic
+
+base_parameters = {'layers':5,'polygons':20,'vertices':16,'holes':0}
+sweeps = {}
+sweeps['layers'] = [3,5,9,17]
+sweeps['polygons'] = [10,20,40,80]
+sweeps['vertices'] = [8,16,64,256]
+sweeps['holes'] = [0,1,4,16]
+quick_sweeps = dict([(key,values[:3]) for key,values in sweeps.items()])
+
+def prepare(parameters,seed):
+    '''build the inputs shared by all cases for one set of parameters'''
+    layerdef = synthetic.layer_definition(parameters['layers'])
+    args = parameters['polygons'],parameters['vertices'],parameters['holes']
+    inputs = {}
+    inputs['layerdef'] = layerdef
+    inputs['a'] = synthetic.random_laminate(layerdef,*args,seed = seed)
+    inputs['b'] = synthetic.random_laminate(layerdef,*args,seed = seed+1)
+    inputs['sheet'] = synthetic.sheet(layerdef,inputs['a'])
+    inputs['generic'] = inputs['a'].genericfromls()
+    return inputs
+
+def fresh(laminate):
+    '''copy a laminate's geometry into new layers so that no cached union is reused between repeats'''
+    new = synthetic.Laminate(laminate.layerdef)
+    for layer in laminate.layerdef.layers:
+        new.replacelayergeoms(layer,laminate.layer_sequence[layer].geoms[:])
+    return new
+
+scaling = popupcad.internal_argument_scaling
+cases = {}
+cases['union'] = lambda inputs:fresh(inputs['a']).union(fresh(inputs['b']))
+cases['difference'] = lambda inputs:fresh(inputs['a']).difference(fresh(inputs['b']))
+cases['buffer'] = lambda inputs:fresh(inputs['a']).buffer(.5*scaling,resolution = popupcad.default_buffer_resolution)
+cases['millkeepout'] = lambda inputs:keepout.millkeepout(fresh(inputs['a']))
+cases['millflipkeepout'] = lambda inputs:keepout.millflipkeepout(fresh(inputs['a']))
+cases['generate_removable_scrap'] = lambda inputs:removability.generate_removable_scrap(fresh(inputs['a']),fresh(inputs['sheet']))
+cases['bodydetection'] = lambda inputs:bodydetection.find(inputs['generic'],inputs['layerdef'])
+cases['getcontrols'] = lambda inputs:OperationOutput.getcontrols(inputs['generic'])
+
+def time_case(function,inputs,repeat):
+    '''return the best time of several runs'''
+    times = []
+    for ii in range(repeat):
+        t0 = time.perf_counter()
+        function(inputs)
+        times.append(time.perf_counter()-t0)
+    return min(times)
+
+def scaling_exponent(xs,ys):
+    '''slope of log(time) against log(parameter), for parameters above zero'''
+    points = [(x,y) for x,y in zip(xs,ys) if x>0 and y>0]
+    if len(points)<2:
+        return None
+    x,y = numpy.log(numpy.array(points)).T
+    return float(numpy.polyfit(x,y,1)[0])
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git','rev-parse','HEAD'],stderr = subprocess.DEVNULL).decode().strip()
+    except (OSError,subprocess.CalledProcessError):
+        return None
+
+def run(case_names = None,sweeps = sweeps,repeat = 3,seed = 0,verbose = True):
+    case_names = case_names or sorted(cases.keys())
+    results = {}
+    results['commit'] = git_commit()
+    results['time'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    results['python'] = sys.version.split()[0]
+    results['shapely'] = shapely.__version__
+    results['base_parameters'] = base_parameters
+    results['seed'] = seed
+    results['sweeps'] = {}
+
+    for parameter,values in sorted(sweeps.items()):
+        sweep = dict([(name,[]) for name in case_names])
+        for value in values:
+            parameters = base_parameters.copy()
+            parameters[parameter] = value
+            inputs = prepare(parameters,seed)
+            for name in case_names:
+                sweep[name].append(time_case(cases[name],inputs,repeat))
+        results['sweeps'][parameter] = {'values':values,'times':sweep,'exponents':dict([(name,scaling_exponent(values,times)) for name,times in sweep.items()])}
+        if verbose:
+            print_sweep(parameter,results['sweeps'][parameter])
+    return results
+
+def print_sweep(parameter,sweep):
+    print('{0} {1}'.format(parameter,sweep['values']))
+    for name,times in sorted(sweep['times'].items()):
+        exponent = sweep['exponents'][name]
+        exponent = '' if exponent == None else 'O(n^{0:.2f})'.format(exponent)
+        print('    {0:26s}{1}  {2}'.format(name,' '.join(['{0:9.4f}'.format(t) for t in times]),exponent))
+
+def compare(filename1,filename2):
+    '''print the ratio of times between two result files, old over new'''
+    with open(filename1) as f:
+        results1 = json.load(f)
+    with open(filename2) as f:
+        results2 = json.load(f)
+    print('{0} -> {1}  (speedup, old time / new time)'.format(results1['commit'],results2['commit']))
+    for parameter,sweep1 in sorted(results1['sweeps'].items()):
+        try:
+            sweep2 = results2['sweeps'][parameter]
+        except KeyError:
+            continue
+        if sweep1['values']!=sweep2['values']:
+            continue
+        print('{0} {1}'.format(parameter,sweep1['values']))
+        for name,times1 in sorted(sweep1['times'].items()):
+            try:
+                times2 = sweep2['times'][name]
+            except KeyError:
+                continue
+            print('    {0:26s}{1}'.format(name,' '.join(['{0:8.2f}x'.format(t1/t2) for t1,t2 in zip(times1,times2)])))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark the laminate CSG core on synthetic laminates.')
+    parser.add_argument('-o','--output',default = None,help = 'json file to write results to')
+    parser.add_argument('-c','--case',action = 'append',dest = 'cases',choices = sorted(cases.keys()),help = 'case to run, may be repeated.  defaults to all')
+    parser.add_argument('-r','--repeat',type = int,default = 3)
+    parser.add_argument('-s','--seed',type = int,default = 0)
+    parser.add_argument('--quick',action = 'store_true',help = 'run shorter sweeps')
+    parser.add_argument('--compare',nargs = 2,metavar = ('OLD','NEW'),help = 'compare two result files instead of running')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = run(args.cases,quick_sweeps if args.quick else sweeps,args.repeat,args.seed)
+    if args.output != None:
+        with open(args.output,'w') as f:
+            json.dump(results,f,indent = 1)
+
+if __name__=='__main__':
+    main()
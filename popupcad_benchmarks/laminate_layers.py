@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+
+Compare serial and parallel per-layer execution of Laminate buffer and difference.
+Run with: python -m popupcad_benchmarks.laminate_layers
+"""
+import random
+import time
+import shapely.geometry as sg
+import popupcad
+import popupcad.geometry.customshapely as customshapely
+from popupcad.filetypes.laminate import Laminate
+from popupcad.filetypes.layerdef import LayerDef
+from popupcad.materials.materials import Carbon_0_90_0,Pyralux,Kapton
+
+def random_laminate(layerdef,num_shapes,seed,size = 1000.,radius = 20.):
+    random.seed(seed)
+    laminate = Laminate(layerdef)
+    for layer in layerdef.layers:
+        geoms = [sg.Point(random.random()*size,random.random()*size).buffer(radius*(.5+random.random()),resolution = 16) for ii in range(num_shapes)]
+        laminate.replacelayergeoms(layer,customshapely.multiinit(customshapely.unary_union_safe(geoms)))
+    return laminate
+
+def time_function(function,repeat):
+    t0 = time.time()
+    for ii in range(repeat):
+        result = function()
+    return (time.time()-t0)/repeat,result
+
+def same_laminates(laminate1,laminate2):
+    for layer in laminate1.layerdef.layers:
+        geoms1 = laminate1.layer_sequence[layer].geoms
+        geoms2 = laminate2.layer_sequence[layer].geoms
+        if len(geoms1)!=len(geoms2):
+            return False
+        if not all([geom1.equals_exact(geom2,0) for geom1,geom2 in zip(geoms1,geoms2)]):
+            return False
+    return True
+
+def run(num_layers = 9,num_shapes = 400,workers = 4,repeat = 3):
+    materials = [Carbon_0_90_0,Pyralux,Kapton,Pyralux]
+    layerdef = LayerDef(*[materials[ii%len(materials)]() for ii in range(num_layers)])
+    laminate1 = random_laminate(layerdef,num_shapes,0)
+    laminate2 = random_laminate(layerdef,num_shapes,1)
+
+    tests = {}
+    tests['buffer'] = lambda:laminate1.buffer(5.,resolution = popupcad.default_buffer_resolution)
+    tests['difference'] = lambda:laminate1.difference(laminate2)
+
+    settings = popupcad.settings.layer_execution,popupcad.settings.layer_workers
+    results = {}
+    try:
+        for testname,function in sorted(tests.items()):
+            popupcad.settings.layer_execution = 'serial'
+            serial_time,serial_result = time_function(function,repeat)
+            results[testname,'serial'] = serial_time
+            for mode in ['threads','processes']:
+                popupcad.settings.layer_execution = mode
+                popupcad.settings.layer_workers = workers
+                function()
+                t,result = time_function(function,repeat)
+                if not same_laminates(serial_result,result):
+                    raise(Exception('{0} result differs in {1} mode'.format(testname,mode)))
+                results[testname,mode] = t
+    finally:
+        popupcad.settings.layer_execution,popupcad.settings.layer_workers = settings
+
+    for testname in sorted(tests):
+        serial_time = results[testname,'serial']
+        for mode in ['serial','threads','processes']:
+            t = results[testname,mode]
+            print('{0:12s}{1:12s}{2:10.4f}s{3:8.2f}x'.format(testname,mode,t,serial_time/t))
+    return results
+
+if __name__=='__main__':
+    run()
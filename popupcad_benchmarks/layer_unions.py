@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+
+Count the unions performed by a chain of laminate operations (the Cleanup3 pipeline),
+with and without reuse of each layer's merged geometry.
+Run with: python -m popupcad_benchmarks.layer_unions
+"""
+import time
+import popupcad.geometry.customshapely as customshapely
+from popupcad.filetypes.laminate import Laminate
+from popupcad.filetypes.layerdef import LayerDef
+from popupcad.materials.materials import Carbon_0_90_0,Pyralux,Kapton
+from popupcad_benchmarks.laminate_layers import random_laminate,same_laminates
+
+class UnionCounter(object):
+    '''temporarily replace customshapely.unary_union_safe with a counting wrapper'''
+    def __enter__(self):
+        self.count = 0
+        self.original = customshapely.unary_union_safe
+        def counted(listin):
+            self.count+=1
+            return self.original(listin)
+        customshapely.unary_union_safe = counted
+        return self
+    def __exit__(self,*args):
+        customshapely.unary_union_safe = self.original
+
+def forget(ls):
+    '''rebuild a laminate from its geometry alone, discarding any merged geometry, as before layers cached their union'''
+    new = Laminate(ls.layerdef)
+    for layer in ls.layerdef.layers:
+        new.replacelayergeoms(layer,ls.layer_sequence[layer].geoms)
+    return new
+
+def cleanup_chain(ls1,value,res,wrap):
+    ls1 = wrap(ls1)
+    ls2 = wrap(ls1.buffer(-value,resolution = res))
+    ls3 = wrap(ls2.buffer(2*value,resolution = res))
+    ls4 = wrap(ls1.intersection(ls3))
+    ls5 = wrap(ls1.buffer(value*10,resolution = res))
+    ls6 = wrap(ls5.difference(ls1))
+    ls7 = wrap(ls6.buffer(-value,resolution = res))
+    ls8 = wrap(ls7.buffer(2*value,resolution = res))
+    ls9 = wrap(ls6.intersection(ls8))
+    ls9_1 = wrap(ls5.difference(ls9))
+    ls10 = wrap(ls4.symmetric_difference(ls9_1))
+    ls11 = wrap(ls1.symmetric_difference(ls10))
+    return ls11
+
+def run(num_layers = 5,num_shapes = 200,value = 2.,res = 4):
+    materials = [Carbon_0_90_0,Pyralux,Kapton,Pyralux]
+    layerdef = LayerDef(*[materials[ii%len(materials)]() for ii in range(num_layers)])
+    source = random_laminate(layerdef,num_shapes,0)
+
+    results = {}
+    for name,wrap in [('uncached',forget),('cached',lambda ls:ls)]:
+        with UnionCounter() as counter:
+            t0 = time.time()
+            result = cleanup_chain(source,value,res,wrap)
+            results[name] = time.time()-t0,counter.count,result
+
+    for name in ['uncached','cached']:
+        t,count,result = results[name]
+        print('{0:10s}{1:6d} unions{2:10.4f}s'.format(name,count,t))
+    a = results['uncached'][2]
+    b = results['cached'][2]
+    for layer in layerdef.layers:
+        difference = a.layer_sequence[layer].merged().symmetric_difference(b.layer_sequence[layer].merged())
+        print('{0:20s} area difference {1:.3g}'.format(str(layer),difference.area))
+    print('identical geometry: {0}'.format(same_laminates(a,b)))
+    return results
+
+if __name__=='__main__':
+    run()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Written by Daniel M. Aukes.
+Email: danaukes<at>seas.harvard.edu.
+Please see LICENSE.txt for full license.
+
+Seeded random laminates for benchmarking.
+"""
+import math
+import random
+import shapely.geometry as sg
+import popupcad
+import popupcad.geometry.customshapely as customshapely
+from popupcad.filetypes.laminate import Laminate
+from popupcad.filetypes.layerdef import LayerDef
+from popupcad.materials.materials import Carbon_0_90_0,Pyralux,Kapton
+
+def layer_definition(num_layers):
+    '''alternate rigid and adhesive layers, with kapton in the middle, like a typical popup laminate'''
+    materials = [Carbon_0_90_0,Pyralux,Kapton,Pyralux]
+    return LayerDef(*[materials[ii%len(materials)]() for ii in range(num_layers)])
+
+def ring(rng,x,y,radius,num_vertices,jitter = .2):
+    '''a closed ring of points around (x,y), each at a randomly perturbed radius'''
+    points = []
+    for ii in range(num_vertices):
+        theta = 2*math.pi*ii/num_vertices
+        r = radius*(1-jitter*rng.random())
+        points.append((x+r*math.cos(theta),y+r*math.sin(theta)))
+    return points
+
+def random_polygon(rng,x,y,radius,num_vertices,num_holes):
+    '''a star-shaped polygon with num_holes non-overlapping holes placed around its centre'''
+    exterior = ring(rng,x,y,radius,num_vertices)
+    holes = []
+    if num_holes>0:
+        hole_radius = .3*radius/max(1,num_holes**.5)
+        for ii in range(num_holes):
+            theta = 2*math.pi*ii/num_holes
+            offset = 0 if num_holes==1 else .45*radius
+            holes.append(ring(rng,x+offset*math.cos(theta),y+offset*math.sin(theta),hole_radius,max(4,num_vertices//4),jitter = 0))
+    return sg.Polygon(exterior,holes)
+
+def random_laminate(layerdef,num_polygons,num_vertices = 16,num_holes = 0,seed = 0,size = 100.,radius = 5.):
+    '''a laminate with num_polygons random polygons per layer, unioned within each layer.  sizes are in mm'''
+    rng = random.Random(seed)
+    scaling = popupcad.internal_argument_scaling
+    laminate = Laminate(layerdef)
+    for layer in layerdef.layers:
+        polygons = []
+        for ii in range(num_polygons):
+            x = rng.random()*size*scaling
+            y = rng.random()*size*scaling
+            r = radius*scaling*(.5+rng.random())
+            polygons.append(random_polygon(rng,x,y,r,num_vertices,num_holes))
+        laminate.replacelayergeoms(layer,customshapely.multiinit(customshapely.unary_union_safe(polygons)))
+    return laminate
+
+def sheet(layerdef,laminate,margin = 10.):
+    '''a rectangular sheet covering the bounds of a laminate in every layer'''
+    geoms = [geom for layer in layerdef.layers for geom in laminate.layer_sequence[layer].geoms]
+    bounds = sg.GeometryCollection(geoms).bounds if geoms else (0,0,0,0)
+    m = margin*popupcad.internal_argument_scaling
+    box = sg.box(bounds[0]-m,bounds[1]-m,bounds[2]+m,bounds[3]+m)
+    laminate = Laminate(layerdef)
+    for layer in layerdef.layers:
+        laminate.replacelayergeoms(layer,customshapely.multiinit(box))
+    return laminate
@@ -21,23 +21,36 @@ def sort_lams(lams,values):
 
 
 def find(generic,layerdef):
+    '''group the shapes of a generic laminate into bodies: sets of shapes connected through overlaps with adhesive neighbors'''
     from popupcad.filetypes.laminate import Laminate
+    from popupcad.geometry.spatialindex import SpatialIndex,DisjointSets
     
     layer_dict = dict([(geom.id,layer) for layer,geoms in generic.items() for geom in geoms])
     geom_dict = dict([(geom.id,geom) for layer,geoms in generic.items() for geom in geoms])
-    geom_dict_whole = geom_dict.copy()
+    shapely_dict = dict([(geom_id,geom.outputshapely()) for geom_id,geom in geom_dict.items()])
+    layer_ids = dict([(layer,[geom.id for geom in geoms]) for layer,geoms in generic.items()])
     
+    bodies = DisjointSets(geom_dict.keys())
+    for layer,ids in layer_ids.items():
+        ii = layerdef.layers.index(layer)
+        for neighbor in layerdef.connected_neighbors(layer):
+#            each pair of neighboring layers is checked once, from the lower layer
+            if layerdef.layers.index(neighbor)<ii or not neighbor in layer_ids:
+                continue
+            neighbor_ids = layer_ids[neighbor]
+            index = SpatialIndex([shapely_dict[geom_id] for geom_id in neighbor_ids])
+            for geom_id in ids:
+                for jj in index.intersecting(shapely_dict[geom_id]):
+                    bodies.join(geom_id,neighbor_ids[jj])
+
     laminates = []
     values = []
-    while len(geom_dict)>0:
+    for gs in bodies.groups(geom_dict.keys()):
         laminate = Laminate(layerdef)
-        key = list(geom_dict.keys())[0]
-        gs = findallconnectedneighborgeoms(key,generic,geom_dict,layerdef)
-        geom_mins = numpy.array([find_minimum_xy(geom_dict_whole[geom_id]) for geom_id in gs])
+        geom_mins = numpy.array([find_minimum_xy(geom_dict[geom_id]) for geom_id in gs])
         values.append(tuple(geom_mins.min(0)))
         for item_id in gs:
-            geom = geom_dict_whole[item_id]
-            laminate.insertlayergeoms(layer_dict[item_id], [geom.outputshapely()])
+            laminate.insertlayergeoms(layer_dict[item_id], [shapely_dict[item_id]])
         laminates.append(laminate)
     laminates = sort_lams(laminates,values)
     return laminates
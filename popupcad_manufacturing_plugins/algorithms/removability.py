@@ -4,26 +4,21 @@ Written by Daniel M. Aukes.
 Email: danaukes<at>seas.harvard.edu.
 Please see LICENSE.txt for full license.
 """
-from popupcad.filetypes.layer import Layer
-from popupcad.filetypes.laminate import Laminate
+from popupcad.algorithms.keepout import keepout_unions
 import popupcad.materials.materials as mat
 
 def one_way_up(laminatein):
-    l = Layer([])
-    laminateout = Laminate(laminatein.layerdef)
-    for ii,geoms in enumerate(laminatein):
-        l = l.union(geoms)
-        laminateout[ii] =l
-    laminateout = modify_up(laminateout)
+    unions = keepout_unions(laminatein)
+    laminateout = modify_up(unions.laminate(unions.prefix))
     return laminateout
 
 def one_way_down(laminatein):
-    return one_way_up(laminatein.flip()).flip()
+#    the cumulative unions of the flipped laminate are the suffix unions, reversed
+    unions = keepout_unions(laminatein)
+    return modify_up(unions.laminate(unions.suffix[::-1])).flip()
 
 def two_way(laminatein):
-    layers = laminatein.layerdef.layers
-    laminateout = laminatein.unarylayeroperation('union',layers,layers)
-    return laminateout
+    return keepout_unions(laminatein).laser()
 
 def modify_up(removabilityin):
     layers = removabilityin.layerdef.layers
@@ -39,7 +34,6 @@ def generate_removable_scrap(device,sheet,tol = 1e-5,device_buffer = 0):
     removability_down = one_way_down(device)
     removability_both = two_way(device)    
     not_removable_region = (removability_up.cleanup(tol)).intersection(removability_down.cleanup(tol))
-    not_removable_scrap_region = not_removable_region.difference(device.cleanup(tol))
     not_removable_scrap_region = not_removable_region.cleanup(tol)
     
     if device_buffer>0:
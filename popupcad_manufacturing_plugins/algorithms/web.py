@@ -32,13 +32,14 @@ def find_outer(ls,minpoint):
     lsouter = Laminate(ls.layerdef)
     lsinner = Laminate(ls.layerdef)
     for layer,layer_geometry in ls.layer_sequence.items():
-        outergeoms = []
-        innergeoms = []
-        for geom in layer_geometry.geoms:
-            if points.pointinpoints(minpoint,GenericShapeBase.genfromshapely(geom).exteriorpoints(),GenericShapeBase.tolerance):
-                outergeoms.append(geom)
-            else:
-                innergeoms.append(geom)
+        exteriors = [GenericShapeBase.genfromshapely(geom).exteriorpoints() for geom in layer_geometry.geoms]
+        allpoints = [point for exterior in exteriors for point in exterior]
+        owners = numpy.repeat(numpy.arange(len(exteriors)),[len(exterior) for exterior in exteriors])
+        touching = points.points_thesame([minpoint],allpoints,GenericShapeBase.tolerance)[0]
+        outer = numpy.zeros(len(exteriors),dtype = bool)
+        outer[owners[touching]] = True
+        outergeoms = [geom for geom,test in zip(layer_geometry.geoms,outer) if test]
+        innergeoms = [geom for geom,test in zip(layer_geometry.geoms,outer) if not test]
         lsouter.replacelayergeoms(layer,outergeoms)
         lsinner.replacelayergeoms(layer,innergeoms)
     return lsouter,lsinner